@@ -1,3 +1,4 @@
+import time
 from argparse import ArgumentParser
 
 import numpy as np
@@ -5,11 +6,13 @@ import pygame
 
 from gridsim.scenes import GLScene
 from collisions.grid import Grid
+from collisions.cspace import CSpace
 from utils.utils import GIT_ROOT
 from gridsim.glutils import load_texture_from_image, draw_background, draw_point
 from gridsim.shapes import Line
 from car.car import Car
-from planning.planner import Planner
+from plan import PLANNERS
+from reeds_shepp.lut import ReedsSheppLUT
 
 
 def parse_args() -> object:
@@ -27,12 +30,37 @@ def parse_args() -> object:
         type = int,
         help = "FPS de la simulación"
     )
+    parser.add_argument(
+        "--lut",
+        default = None,
+        type = str,
+        help = "Tabla de distancias Reeds-Shepp (python -m reeds_shepp.lut)"
+    )
+    parser.add_argument(
+        "--planner",
+        default = "rrt",
+        choices = list(PLANNERS),
+        help = "Planificador: rrt (primera ruta), rrt* (mejora la ruta), rrt-connect (dos árboles), prm (mapa de rutas) o hybrid-a* (búsqueda determinista)"
+    )
+    parser.add_argument(
+        "--anytime",
+        default = None,
+        type = float,
+        help = "Segundos para mejorar la ruta (rrt*) antes de conducir la mejor"
+    )
+    parser.add_argument(
+        "--smooth",
+        default = None,
+        type = float,
+        help = "Segundos para acortar la ruta con atajos Reeds-Shepp antes de conducirla"
+    )
 
     args = parser.parse_args()
     return args
 
 class GridScene(GLScene):
-    def __init__(self, title: str, width: int, height: int, max_fps: int) -> None:
+    def __init__(self, title: str, width: int, height: int, max_fps: int, lut: str=None,
+                 planner: str="rrt", anytime: float=None, smooth: float=None) -> None:
         super().__init__(title, width, height, max_fps)
         self.grid = Grid()
         self.texture_bg = self.load_surface()
@@ -40,9 +68,19 @@ class GridScene(GLScene):
         self.goal = [0.2, 0.2, 0.0]
         x0, y0, yaw0 = (0, 0, 0)
         self.start = [x0, y0, yaw0]
-        self.planner = Planner(self.grid, self.start, self.goal)
+        lut = ReedsSheppLUT.load(lut) if lut is not None else None
+        cspace = CSpace.cached(
+            self.grid, f"{GIT_ROOT}/cspace.npz", Car.width, Car.height, Car.n_disks
+        )
+        self.planner = PLANNERS[planner](self.grid, self.start, self.goal, lut, cspace)
+        self.anytime = anytime
+        self.smooth = smooth
+        if anytime is not None:
+            self.planner.anytime = True
         self.car = Car(x0, y0, yaw0)
         self.state = "SAMPLING"
+        self.planning_start = time.perf_counter()
+        self.plan_time = 0.0
 
     def reset(self, *, start: list=None, goal: list=None) -> None:
         if start is not None:
@@ -50,6 +88,7 @@ class GridScene(GLScene):
         if goal is not None:
             self.goal = goal
         self.state = "SAMPLING"
+        self.planning_start = time.perf_counter()
         self.planner.reset(start=start, goal=goal)
         x0, y0, yaw0 = self.start
         self.car.reset(x0, y0, yaw0)
@@ -103,17 +142,29 @@ class GridScene(GLScene):
     def update(self, **kwargs) -> None:
         super().update(**kwargs)
         if self.state == "SAMPLING":
-            finished = self.planner.update()
+            #Plan for the time left in the frame once the rest of it is done
+            work = self.clock.get_rawtime()/1000 - self.plan_time
+            stats = self.planner.plan_for(max(1/self.max_fps - work, 0.0))
+            self.plan_time = stats["elapsed"]
+            finished = stats["finished"]
+            if self.anytime is not None and stats["solved"]:
+                elapsed = time.perf_counter() - self.planning_start
+                finished = finished or elapsed >= self.anytime
             if finished:
                 self.state = "DRIVING"
-                self.car.trigger(self.planner.get_route())
+                if self.smooth is None:
+                    route = self.planner.get_route()
+                else:
+                    route, _ = self.planner.smooth_route(1000, self.smooth)
+                self.car.trigger(route)
         if self.state == "DRIVING":
             self.car.drive()
 
 def main():
     args = parse_args()
 
-    scene = GridScene("Grid", args.width, args.width, args.fps)
+    scene = GridScene("Grid", args.width, args.width, args.fps, args.lut, args.planner,
+                      args.anytime, args.smooth)
     scene.run()
 
 
@@ -0,0 +1,74 @@
+"""
+Compare the planners on the same queries: success rate, time to the route
+and route length, over a few seeds each.
+
+PYTHONPATH=./src/car_planner python scripts/benchmark.py [--planners rrt hybrid-a*] [--seeds 5]
+"""
+
+import random
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+from car.car import Car
+from collisions.grid import Grid
+from collisions.cspace import CSpace
+from plan import PLANNERS
+
+
+QUERIES = [
+    ((0.0, 0.0, 0.0), (0.2, 0.2, 0.0)),
+    ((0.0, 0.0, 0.0), (0.5, 0.5, 0.0)),
+    ((0.0, 0.0, 0.0), (0.5, 0.5, 3.14)),
+    ((0.0, 0.0, 0.0), (0.7, 0.0, 3.14)),
+    ((0.0, 0.0, 0.0), (-0.7, 0.6, 3.0)),
+]
+
+
+def parse_args() -> object:
+    parser = ArgumentParser()
+    parser.add_argument("--planners", nargs="+", default=list(PLANNERS), choices=list(PLANNERS))
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds per query")
+    return parser.parse_args()
+
+
+def run(planner: object, timeout: float) -> tuple:
+    t0 = time.perf_counter()
+    while not planner.update():
+        if time.perf_counter() - t0 > timeout or getattr(planner, "failed", False):
+            return None, time.perf_counter() - t0
+    route = planner.get_route()
+    return route, time.perf_counter() - t0
+
+
+def main() -> None:
+    args = parse_args()
+    grid = Grid()
+    cspace = CSpace(grid, Car.width, Car.height, Car.n_disks)
+    print(f"{'planner':<12} {'query':<28} {'solved':>6} {'median s':>9} {'max s':>7} {'length':>7}")
+    for name in args.planners:
+        for start, goal in QUERIES:
+            times = []
+            lengths = []
+            for seed in range(args.seeds):
+                random.seed(seed)
+                np.random.seed(seed)
+                planner = PLANNERS[name](grid, start, goal, cspace=cspace)
+                route, elapsed = run(planner, args.timeout)
+                times.append(elapsed)
+                if route is not None and len(route):
+                    lengths.append(
+                        np.linalg.norm(np.diff(route[:, :2], axis=0), axis=1).sum()
+                    )
+            query = f"{goal}"
+            length = np.median(lengths) if lengths else float("nan")
+            print(
+                f"{name:<12} {query:<28} {len(lengths):>3}/{args.seeds:<2} "
+                f"{np.median(times):>9.3f} {max(times):>7.3f} {length:>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,54 +2,50 @@ import math
 
 import numpy as np
 
-from gridsim.shapes import Rectangle
-import gridsim.glutils as GLUtils
+from collisions.footprint import footprint_disks, footprint_centres, footprint_collides
 
 
 class Car:
+    width = 0.1
+    height = 0.05
+    n_disks = 2
+
     def __init__(self, x0: float, y0: float, yaw: float) -> None:
-        self.width = 0.1
-        self.height = 0.05
-        self.rect = Rectangle(x0, y0, self.width, self.height, yaw)
+        self.pose = (x0, y0, yaw)
         self.trajectory = None
+        self.step = 0
 
     def drive(self) -> None:
-        if not self.trajectory:
+        if self.trajectory is None or self.step >= len(self.trajectory):
             return
-        x, y, yaw = self.trajectory.pop(0)
-        self.rect = Rectangle(x, y, self.width, self.height, yaw)
+        x, y, yaw = self.trajectory[self.step]
+        self.step += 1
+        self.pose = (x, y, yaw)
 
     def reset(self, x0: float, y0: float, yaw: float) -> None:
         self.trajectory = None
-        self.rect = Rectangle(x0, y0, self.width, self.height, yaw)
+        self.step = 0
+        self.pose = (x0, y0, yaw)
 
     def draw(self) -> None:
-        self.rect.draw(color = (0.16, 0.71, 0.79, 1.0))
+        from gridsim.shapes import Rectangle
 
-    def split(self) -> list:
-        upper = 0.25 * self.rect.h * np.array(
-            [-math.sin(self.rect.yaw), math.cos(self.rect.yaw)]
-        )
-        points = [
-            self.rect.center + upper, 
-            self.rect.center - upper
-        ]
-        for point in points:
-            GLUtils.draw_point(*point, size=5)
-        return points
+        x, y, yaw = self.pose
+        rect = Rectangle(x, y, self.width, self.height, yaw)
+        rect.draw(color = (0.16, 0.71, 0.79, 1.0))
 
-    def collides(self, grid: object) -> None:
-        for x, y in self.split():
-            if grid.point_collides(x, y):
-                return True
-        return False
+    def split(self) -> np.ndarray:
+        centres, _ = footprint_disks(self.width, self.height, self.n_disks)
+        return footprint_centres(self.pose, centres)[0]
 
-    def trigger(self, trajectory: list, ds: float=0.005) -> None:
-        self.trajectory = trajectory
+    def collides(self, grid: object) -> bool:
+        return bool(footprint_collides(
+            self.pose, grid, self.width, self.height, self.n_disks
+        )[0])
 
-    @property
-    def pose(self) -> tuple:
-        return *self.rect.center, self.rect.yaw
+    def trigger(self, trajectory: np.ndarray, ds: float=0.005) -> None:
+        self.trajectory = trajectory
+        self.step = 0
 
 
 def interpolate_trajectory(trajectory, ds, orientation_method='tangent'):
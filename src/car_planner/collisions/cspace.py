@@ -0,0 +1,196 @@
+import os
+import math
+
+import numpy as np
+
+from collisions.footprint import footprint_collides, footprint_disks
+
+
+class CSpace:
+    """
+    Configuration space occupancy of the car on a Grid, indexed by
+    (i, j, yaw bin). The map is conservative: a cell is free only if the car
+    is free (as checked by exact()) at every pose that falls in the cell and
+    yaw bin, so it may reject some free poses but never accepts a colliding
+    one. Poses outside of the grid are checked exactly.
+    """
+    #Saved with the cache, bumped whenever the way cells are checked changes
+    format = 3
+
+    def __init__(self, grid: object, width: float=0.1, height: float=0.05,
+                 n_disks: int=2, yaw_bins: int=64, occupancy: np.ndarray=None) -> None:
+        self.grid = grid
+        self.width = width
+        self.height = height
+        self.n_disks = n_disks
+        self.yaw_bins = yaw_bins
+        if occupancy is None:
+            occupancy = self.build()
+        self.occupancy = occupancy
+        #Free yaw bins of every (i, j) cell, patched by update()
+        self.free = (~occupancy).sum(axis=2)
+        #Running total of free, rebuilt by sample() after updates
+        self.cumulative = None
+        #Bumped on every update, so holders of samples know they are stale
+        self.version = 0
+        grid.observe(self.update)
+
+    @classmethod
+    def of(cls, grid: object, width: float=0.1, height: float=0.05,
+           n_disks: int=2) -> "CSpace":
+        """
+        The C-space of grid for this car, built on the first call and kept
+        on the grid, so planners on the same grid share it.
+        """
+        key = (width, height, n_disks)
+        if key not in grid.cspaces:
+            grid.cspaces[key] = cls(grid, width, height, n_disks)
+        return grid.cspaces[key]
+
+    @classmethod
+    def cached(cls, grid: object, path: str, width: float=0.1, height: float=0.05,
+               n_disks: int=2, yaw_bins: int=64) -> "CSpace":
+        """
+        Load the C-space saved at path if it was built for the same grid and
+        car, otherwise build it and save it there.
+        """
+        if os.path.exists(path):
+            data = np.load(path)
+            same = (
+                "format" in data.files and int(data["format"]) == cls.format and
+                np.array_equal(data["grid"], grid.occupancy) and
+                float(data["width"]) == width and
+                float(data["height"]) == height and
+                int(data["n_disks"]) == n_disks and
+                int(data["yaw_bins"]) == yaw_bins
+            )
+            if same:
+                occupancy = data["occupancy"].copy()
+                return cls(grid, width, height, n_disks, yaw_bins, occupancy)
+        cspace = cls(grid, width, height, n_disks, yaw_bins)
+        cspace.save(path)
+        return cspace
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            occupancy=self.occupancy,
+            grid=self.grid.occupancy,
+            width=self.width,
+            height=self.height,
+            n_disks=self.n_disks,
+            yaw_bins=self.yaw_bins,
+            format=self.format,
+        )
+
+    def exact(self, poses: np.ndarray) -> np.ndarray:
+        return footprint_collides(
+            poses, self.grid, self.width, self.height, self.n_disks
+        )
+
+    def windows(self) -> tuple:
+        """
+        (n_disks, 2) disk centres of the car in the car frame, and the
+        half-width in cells of the square window each one is checked in.
+        exact() checks a (2R+1)^2 window around the cell of every disk
+        centre; inside a cell and yaw bin the pose moves up to half a cell
+        along each axis and half a bin, which moves the centre up to one
+        cell (rounding included) plus the chord of its turn.
+        """
+        res = self.grid.res
+        centres, radius = footprint_disks(self.width, self.height, self.n_disks)
+        turn = np.hypot(centres[:, 0], centres[:, 1]) * np.pi/self.yaw_bins
+        return centres, self.grid.cells(radius) + 1 + turn*res/2
+
+    def build(self, rows: slice=slice(None), cols: slice=slice(None)) -> np.ndarray:
+        res = self.grid.res
+        i = np.arange(res)[rows]
+        j = np.arange(res)[cols]
+        yaw = 2*np.pi*np.arange(self.yaw_bins)/self.yaw_bins
+        centres, half = self.windows()
+
+        #Disk centres in cells, (i, j, yaw bin, disk)
+        cos_th, sin_th = np.cos(yaw)[:, None], np.sin(yaw)[:, None]
+        x = i[:, None, None, None] + (centres[:, 0]*cos_th - centres[:, 1]*sin_th)*res/2
+        y = j[None, :, None, None] + (centres[:, 0]*sin_th + centres[:, 1]*cos_th)*res/2
+
+        #Obstacle cells in every window, 4 reads of the integral image each
+        occupied = self.grid.occupancy > 0
+        integral = np.zeros((res + 1, res + 1), dtype=int)
+        integral[1:, 1:] = occupied.cumsum(axis=0).cumsum(axis=1)
+        x_lo = np.clip(np.ceil(x - half - 1e-9), 0, res).astype(int)
+        x_hi = np.clip(np.floor(x + half + 1e-9) + 1, 0, res).astype(int)
+        y_lo = np.clip(np.ceil(y - half - 1e-9), 0, res).astype(int)
+        y_hi = np.clip(np.floor(y + half + 1e-9) + 1, 0, res).astype(int)
+        counts = (
+            integral[x_hi, y_hi] - integral[x_lo, y_hi] -
+            integral[x_hi, y_lo] + integral[x_lo, y_lo]
+        )
+        return (counts > 0).any(axis=-1)
+
+    def update(self, i: int, j: int) -> None:
+        """
+        Rebuild the cells whose footprint may cover grid cell (i, j)
+        """
+        res = self.grid.res
+        centres, half = self.windows()
+        reach = np.hypot(centres[:, 0], centres[:, 1]).max()
+        margin = math.ceil(half.max() + reach*res/2) + 1
+        rows = slice(max(0, i - margin), min(res, i + margin + 1))
+        cols = slice(max(0, j - margin), min(res, j + margin + 1))
+        self.occupancy[rows, cols] = self.build(rows, cols)
+        self.free[rows, cols] = (~self.occupancy[rows, cols]).sum(axis=2)
+        self.cumulative = None
+        self.version += 1
+
+    def sample(self, n: int) -> np.ndarray:
+        """
+        (n, 3) poses drawn uniformly from the free cells, each one jittered
+        inside its cell and yaw bin, so all of them are free.
+        """
+        if self.cumulative is None:
+            self.cumulative = np.cumsum(self.free.ravel())
+        total = self.cumulative[-1]
+        if total == 0:
+            return np.empty((0, 3))
+        #Rank of every pose among all the free cells, then its (i, j) cell
+        #and the free yaw bin of that rank inside it
+        rank = np.random.randint(total, size=n)
+        cell = np.searchsorted(self.cumulative, rank, side="right")
+        i, j = np.unravel_index(cell, self.free.shape)
+        rank -= self.cumulative[cell] - self.free[i, j]
+        free_bins = np.cumsum(~self.occupancy[i, j], axis=1)
+        k = np.argmax(free_bins > rank[:, None], axis=1)
+        #Strictly less than half a cell, the pose must round to its cell
+        jitter = np.random.uniform(-0.499, 0.499, (3, n))
+        res = self.grid.res
+        return np.stack([
+            2*(i + jitter[0])/res - 1,
+            2*(j + jitter[1])/res - 1,
+            2*np.pi*(k + jitter[2])/self.yaw_bins,
+        ], axis=1)
+
+    def yaw_bin(self, yaw: np.ndarray) -> np.ndarray:
+        k = np.round(np.mod(yaw, 2*np.pi) / (2*np.pi) * self.yaw_bins)
+        return k.astype(int) % self.yaw_bins
+
+    def poses_collide(self, poses: np.ndarray) -> np.ndarray:
+        poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+        res = self.grid.res
+        idx = np.round((poses[:, :2] + 1)*res/2).astype(int)
+        inside = np.all((idx >= 0) & (idx < res), axis=1)
+        collides = np.empty(len(poses), dtype=bool)
+        collides[inside] = self.occupancy[
+            idx[inside, 0], idx[inside, 1], self.yaw_bin(poses[inside, 2])
+        ]
+        if not inside.all():
+            collides[~inside] = self.exact(poses[~inside])
+        return collides
+
+    def pose_collides(self, pose: list) -> bool:
+        x, y, yaw = pose
+        i, j = self.grid.ortho_to_grid(x, y)
+        if 0 <= i < self.grid.res and 0 <= j < self.grid.res:
+            k = round((yaw % (2*math.pi)) / (2*math.pi) * self.yaw_bins)
+            return bool(self.occupancy[i, j, k % self.yaw_bins])
+        return bool(self.exact(np.array([pose], dtype=float))[0])
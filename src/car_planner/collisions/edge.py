@@ -0,0 +1,94 @@
+"""
+Collision checking of traced edges: poses are checked in bisection order,
+coarse to fine, and the check stops at the first level with a hit. Batches
+of Reeds-Shepp edges are traced and checked at once with edges_collide.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from collisions.footprint import footprint_disks, footprint_collides
+from reeds_shepp.batch import path_from_word
+from reeds_shepp.draw import trace_paths
+
+
+def edge_resolution(grid: object, turning_radius: float=0.1, width: float=0.1,
+                    height: float=0.05, n_disks: int=2) -> float:
+    """
+    Arc length between traced poses such that no disk centre of the
+    footprint moves more than half a grid cell between two of them. On an
+    arc a centre at distance d from the pose moves (1 + d/turning_radius)
+    times the arc length. A centre in between two traced poses is within a
+    quarter cell of one of them, so it rounds to the same or a neighbouring
+    cell: checked with the disks grown by trace_margin, no cell is skipped.
+    """
+    cell = 2 / grid.res
+    centres, _ = footprint_disks(width, height, n_disks)
+    reach = np.hypot(centres[:, 0], centres[:, 1]).max()
+    return 0.5 * cell / (1 + reach / turning_radius)
+
+
+def trace_margin(grid: object) -> float:
+    """Disk padding of poses traced at edge_resolution, one grid cell"""
+    return 2 / grid.res
+
+
+@lru_cache(maxsize=256)
+def bisection_levels(n: int, min_batch: int=8) -> tuple:
+    """
+    Indices 1..n-1 of an edge with n poses, grouped in levels: the end
+    pose, then every 2^k-th pose for decreasing k. Pose 0 is skipped, it is
+    the milestone the edge starts from. The first levels are merged until
+    they hold min_batch poses, tiny checks are not worth a call.
+    """
+    if n < 2:
+        return ()
+    levels = [np.array([n - 1])]
+    stride = 1
+    while 2*stride < n - 1:
+        stride *= 2
+    while stride >= 1:
+        levels.append(np.arange(stride, n - 1, 2*stride))
+        stride //= 2
+
+    merged = []
+    current = []
+    for level in levels:
+        current.append(level)
+        if sum(len(idx) for idx in current) >= min_batch:
+            merged.append(np.concatenate(current))
+            current = []
+    if current:
+        merged.append(np.concatenate(current))
+    return tuple(merged)
+
+
+def edge_collides(poses: np.ndarray, grid: object, width: float=0.1,
+                  height: float=0.05, n_disks: int=2) -> bool:
+    """
+    Whether any of the (N, 3) poses but the first one, traced at
+    edge_resolution, collides.
+    """
+    for idx in bisection_levels(len(poses)):
+        if footprint_collides(
+            poses[idx], grid, width, height, n_disks, trace_margin(grid)
+        ).any():
+            return True
+    return False
+
+
+def edges_collide(grid: object, starts: np.ndarray, words: np.ndarray,
+                  params: np.ndarray, resolution: float, width: float=0.1,
+                  height: float=0.05, n_disks: int=2) -> np.ndarray:
+    """
+    (E,) bool array, True where the edge collides anywhere along its trace.
+    Edge e is the path (words[e], params[e]) of get_optimal_paths_batch
+    from starts[e], all of them are traced and checked at once.
+    """
+    paths = [path_from_word(word, p) for word, p in zip(words, params)]
+    points, offsets = trace_paths(paths, starts, 0.1, resolution)
+    collides = footprint_collides(
+        points, grid, width, height, n_disks, trace_margin(grid)
+    )
+    return np.logical_or.reduceat(collides, offsets[:-1])
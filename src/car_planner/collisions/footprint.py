@@ -0,0 +1,44 @@
+"""
+Car footprint as a set of covering disks, checked against a Grid with
+NumPy only (no OpenGL).
+"""
+
+import numpy as np
+
+
+def footprint_disks(width: float=0.1, height: float=0.05, n_disks: int=2) -> tuple:
+    """
+    Cover a width x height rectangle (width along the heading) with n_disks
+    equal disks centred on its long axis.
+    Returns the (n_disks, 2) centres in the car frame and their radius.
+    """
+    step = width / n_disks
+    centres = np.zeros((n_disks, 2))
+    centres[:, 0] = -0.5*width + step*(np.arange(n_disks) + 0.5)
+    radius = float(np.hypot(0.5*step, 0.5*height))
+    return centres, radius
+
+
+def footprint_centres(poses: np.ndarray, centres: np.ndarray) -> np.ndarray:
+    """
+    (N, n_disks, 2) disk centres of the car at each of the (N, 3) poses
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+    cos_th = np.cos(poses[:, 2])[:, None]
+    sin_th = np.sin(poses[:, 2])[:, None]
+    x = poses[:, 0, None] + centres[:, 0]*cos_th - centres[:, 1]*sin_th
+    y = poses[:, 1, None] + centres[:, 0]*sin_th + centres[:, 1]*cos_th
+    return np.stack([x, y], axis=-1)
+
+
+def footprint_collides(poses: np.ndarray, grid: object, width: float=0.1,
+                       height: float=0.05, n_disks: int=2,
+                       margin: float=0.0) -> np.ndarray:
+    """
+    (N,) bool array, True where the car at the (N, 3) poses hits an
+    obstacle of grid. The disks are grown by margin.
+    """
+    centres, radius = footprint_disks(width, height, n_disks)
+    points = footprint_centres(poses, centres)
+    collides = grid.points_collide(points.reshape(-1, 2), radius + margin)
+    return collides.reshape(-1, n_disks).any(axis=1)
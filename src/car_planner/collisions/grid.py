@@ -1,31 +1,47 @@
+import math
+import weakref
+
 import numpy as np
 
-from gridsim.shapes import Point
-from utils.utils import GIT_ROOT
+from utils.utils import git_root
 
 
 class Grid:
-    def __init__(self, res: int=101) -> None:
+    """
+    Occupancy grid of res x res cells over [-1, 1]^2. occupancy is an
+    array or the path of a .npy file, grid.npy of the repository by default.
+    """
+    def __init__(self, res: int=101, occupancy: object=None) -> None:
         self.res = res
-        self.occupancy = np.load(f"{GIT_ROOT}/grid.npy")
-        self.points = [
-            [
-                Point(*self.grid_to_ortho(i, j))
-                if self.occupancy[i][j] == 1.0 else None
-                for j in range(self.res)
-                
-            ]
-            for i in range(self.res)
-        ]
+        if occupancy is None:
+            occupancy = f"{git_root()}/grid.npy"
+        if isinstance(occupancy, str):
+            occupancy = np.load(occupancy)
+        self.occupancy = np.asarray(occupancy, dtype=float)
+        #Inflated obstacle maps, by radius in cells
+        self.inflated = {}
+        #Weak references to the callbacks called with (i, j) every time a
+        #cell changes, see observe()
+        self.observers = []
+        #C-spaces of this grid by car, see CSpace.of
+        self.cspaces = {}
+        #Bumped every time a cell changes
+        self.version = 0
+        #Vertex buffer of the occupied cells, uploaded when version changes
+        self.layer = None
 
     def draw(self, **kwargs) -> None:
-        color = kwargs.get('grid_color', (0.9, 0.2, 0.2, 1.0))
-        pt_size = kwargs.get('point_size', 1)
-        for row in self.points:
-            for pt in row:
-                if pt is None:
-                    continue
-                pt.draw(size=pt_size, color = color)
+        import gridsim.glutils as GLUtils
+
+        if self.layer is None:
+            self.layer = GLUtils.Layer(GLUtils.GL_POINTS)
+        self.layer.color = kwargs.get('grid_color', (0.9, 0.2, 0.2, 1.0))
+        self.layer.size = kwargs.get('point_size', 1)
+        if self.layer.version != self.version:
+            i, j = np.nonzero(self.occupancy == 1.0)
+            points = np.stack([2*i/self.res - 1, 2*j/self.res - 1], axis=1)
+            self.layer.update(points, self.version)
+        self.layer.draw()
 
     def grid_to_ortho(self, i: int, j: int) -> None:
         ortho_x = 2*i/self.res - 1
@@ -44,8 +60,10 @@ class Grid:
         if self.occupancy[i][j] == 1.0:
             return
         self.occupancy[i][j] = 1.0
-        x, y = self.grid_to_ortho(i, j)
-        self.points[i][j] = Point(x, y)
+        for r, inflated in self.inflated.items():
+            inflated[i: i + 2*r + 1, j: j + 2*r + 1] = True
+        self.version += 1
+        self.notify(i, j)
 
     def pop(self, x: float, y: float) -> None:
         i, j = self.ortho_to_grid(x, y)
@@ -54,22 +72,92 @@ class Grid:
         if self.occupancy[i][j] == 0.0:
             return
         self.occupancy[i][j] = 0.0
-        self.points[i][j] = None
+        for r, inflated in self.inflated.items():
+            #Padded cells whose window contains (i, j)
+            rows = slice(i, i + 2*r + 1)
+            cols = slice(j, j + 2*r + 1)
+            inflated[rows, cols] = self.inflate(r, rows, cols)
+        self.version += 1
+        self.notify(i, j)
+
+    def observe(self, callback: object) -> None:
+        """
+        Call callback(i, j) every time a cell changes. Only a weak reference
+        is kept, the grid does not keep its observers alive.
+        """
+        if hasattr(callback, "__self__"):
+            self.observers.append(weakref.WeakMethod(callback))
+        else:
+            self.observers.append(weakref.ref(callback))
+
+    def notify(self, i: int, j: int) -> None:
+        alive = []
+        for ref in self.observers:
+            observer = ref()
+            if observer is None:
+                continue
+            alive.append(ref)
+            observer(i, j)
+        self.observers = alive
 
     def save(self, path: str="grid") -> None:
         np.save(path, self.occupancy)
 
+    def cells(self, r: float) -> int:
+        """Radius r in cells, rounded up so the dilated map covers the disk"""
+        return math.ceil(r*self.res/2)
+
+    def inflate(self, r: int, rows: slice=slice(None), cols: slice=slice(None)) -> np.ndarray:
+        """
+        Obstacle map dilated by a (2r+1)x(2r+1) window, padded by r cells on
+        each side: cell (i, j) is at [i + r, j + r]. rows and cols select a
+        block of the padded map.
+        """
+        occupied = np.pad(self.occupancy > 0, 2*r)
+        #Integral image, so every window sum costs 4 reads
+        integral = np.zeros((occupied.shape[0] + 1, occupied.shape[1] + 1), dtype=int)
+        integral[1:, 1:] = occupied.cumsum(axis=0).cumsum(axis=1)
+        size = self.res + 2*r
+        rows = np.arange(size)[rows]
+        cols = np.arange(size)[cols]
+        top, bottom = rows[:, None], rows[:, None] + 2*r + 1
+        left, right = cols[None, :], cols[None, :] + 2*r + 1
+        window = (
+            integral[bottom, right] - integral[top, right] -
+            integral[bottom, left] + integral[top, left]
+        )
+        return window > 0
+
+    def inflated_map(self, r: int) -> np.ndarray:
+        inflated = self.inflated.get(r)
+        if inflated is None:
+            inflated = self.inflate(r)
+            self.inflated[r] = inflated
+        return inflated
+
     def idx_collides(self, i: int, j: int, r: int=1) -> bool:
-        sub_grid = self.occupancy[
-            max(0, i-r): min(i + r + 1, self.res),
-            max(0, j-r): min(j + r + 1, self.res)
-        ]
-        return sub_grid.sum() > 0
+        inflated = self.inflated_map(r)
+        i, j = i + r, j + r
+        if i < 0 or j < 0 or i >= inflated.shape[0] or j >= inflated.shape[1]:
+            return False
+        return bool(inflated[i, j])
 
     def point_collides(self, x: float, y: float, r: float=0.02) -> bool:
         i, j = self.ortho_to_grid(x, y)
-        r = np.round(r * self.res//2).astype(int)
-        return self.idx_collides(i, j, r)
+        return self.idx_collides(i, j, self.cells(r))
+
+    def points_collide(self, points: np.ndarray, r: float=0.02) -> np.ndarray:
+        """
+        point_collides for an (N, 2) array of points
+        """
+        r = self.cells(r)
+        inflated = self.inflated_map(r)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        idx = np.round((points + 1)*self.res/2).astype(int) + r
+        inside = np.all((idx >= 0) & (idx < inflated.shape[0]), axis=1)
+        collides = np.zeros(len(points), dtype=bool)
+        collides[inside] = inflated[idx[inside, 0], idx[inside, 1]]
+        return collides
 
     def sample(self, r: float) -> None:
         while True:
@@ -0,0 +1,39 @@
+import numpy as np
+
+from car.car import Car
+from collisions.cspace import CSpace
+from collisions.edge import edge_collides, edge_resolution, edges_collide
+from collisions.footprint import footprint_collides
+from collisions.grid import Grid
+from reeds_shepp.batch import get_optimal_paths_batch, path_from_word
+from reeds_shepp.draw import trace_path_points
+
+
+def fine_collides(grid: Grid, start: np.ndarray, path: object) -> bool:
+    """Whether the car hits an obstacle along path traced every 0.0005"""
+    poses = trace_path_points(path, start, 0.1, 0.0005)
+    return bool(footprint_collides(poses[1:], grid, Car.width, Car.height, Car.n_disks).any())
+
+
+def test_traced_edges_catch_every_hit():
+    grid = Grid()
+    resolution = edge_resolution(grid, 0.1, Car.width, Car.height, Car.n_disks)
+    np.random.seed(3)
+    rng = np.random.default_rng(3)
+    starts = CSpace(grid, Car.width, Car.height, Car.n_disks).sample(1000)
+    goals = starts + np.column_stack([rng.uniform(-0.15, 0.15, (1000, 2)), rng.uniform(-1, 1, 1000)])
+    #An edge whose in-between poses hit a cell no traced pose checked
+    starts[0], goals[0] = (0.198, -0.178, -0.004), (0.287, -0.159, -0.051)
+
+    words, params, _ = get_optimal_paths_batch(starts, goals, 0.1)
+    batched = edges_collide(grid, starts, words, params, resolution, Car.width, Car.height, Car.n_disks)
+    hits = 0
+    for start, word, param, collides in zip(starts, words, params, batched):
+        path = path_from_word(word, param)
+        if not fine_collides(grid, start, path):
+            continue
+        hits += 1
+        assert collides
+        poses = trace_path_points(path, start, 0.1, resolution)
+        assert edge_collides(poses, grid, Car.width, Car.height, Car.n_disks)
+    assert batched[0] and hits > 100
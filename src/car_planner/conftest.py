@@ -0,0 +1,5 @@
+import os
+import sys
+
+#The modules import each other from here, e.g. from planning.tree import Tree
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -1,5 +1,6 @@
 from math import cos, sin
 
+import numpy as np
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
@@ -54,6 +55,59 @@ def draw_polygon(points: list, **kwargs) -> None:
     glEnd()
 
 
+class Layer:
+    """
+    Vertices kept in a vertex buffer and drawn with a single glDrawArrays,
+    e.g. all the milestones as GL_POINTS or the route as a GL_LINE_STRIP.
+    The buffer is only uploaded again when update() gets a new version.
+    """
+    def __init__(self, mode: int=GL_POINTS, **kwargs) -> None:
+        self.mode = mode
+        self.color = kwargs.get("color", (1, 1, 1, 1))
+        self.size = kwargs.get("size", 1)
+        self.vbo = None
+        self.capacity = 0
+        self.count = 0
+        self.version = None
+
+    def update(self, points: np.ndarray, version: object=None) -> None:
+        """
+        Upload the (N, 2) points, unless version is the version of the last
+        upload: the same array, or an equal value such as (tree, size).
+        """
+        if version is not None:
+            if version is self.version:
+                return
+            if not isinstance(version, np.ndarray) and version == self.version:
+                return
+        data = np.ascontiguousarray(np.asarray(points)[:, :2], dtype=np.float32)
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        if len(data) > self.capacity:
+            #Room to grow, so a growing tree is not reallocated every frame
+            self.capacity = max(2*len(data), 64)
+            glBufferData(GL_ARRAY_BUFFER, 8*self.capacity, None, GL_DYNAMIC_DRAW)
+        if len(data):
+            glBufferSubData(GL_ARRAY_BUFFER, 0, data.nbytes, data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.count = len(data)
+        self.version = version
+
+    def draw(self) -> None:
+        if self.count == 0:
+            return
+        glColor4f(*self.color)
+        glPointSize(self.size)
+        glLineWidth(self.size)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, None)
+        glDrawArrays(self.mode, 0, self.count)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+
 def load_texture_from_image(image: object, width: int, height):
     # Generate OpenGL texture
     texture_id = glGenTextures(1)
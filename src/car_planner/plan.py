@@ -0,0 +1,131 @@
+"""
+Headless planning: plan() runs a planner on an occupancy grid and returns
+the route, without pygame or OpenGL.
+
+python -m car_planner.plan grid.npy --start 0 0 0 --goal 0.2 0.2 0 --output route.json [--smooth 0.2]
+"""
+
+import json
+import random
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+from car.car import Car
+from collisions.grid import Grid
+from collisions.edge import edge_resolution
+from planning.planner import Planner
+from planning.rrt_star import RRTStarPlanner
+from planning.rrt_connect import RRTConnectPlanner
+from planning.prm import PRMPlanner
+from planning.hybrid_astar import HybridAStarPlanner
+from planning.smoothing import shortcut
+
+
+PLANNERS = {
+    "rrt": Planner,
+    "rrt*": RRTStarPlanner,
+    "rrt-connect": RRTConnectPlanner,
+    "prm": PRMPlanner,
+    "hybrid-a*": HybridAStarPlanner,
+}
+
+
+def plan(grid: object, start: list, goal: list, planner: str="rrt",
+         iterations: int=10000, seed: int=None, workers: int=1,
+         timeout: float=None, anytime: bool=False, mode: str="first",
+         **params) -> np.ndarray:
+    """
+    (N, 3) route from start to goal, empty if none is found within
+    iterations (and timeout seconds, if set). grid is a Grid, an occupancy
+    array or the path of a .npy file. params are passed to the planner
+    (lut, cspace, ...). With anytime, the planner keeps improving its route
+    until the iterations or the timeout run out.
+    With workers > 1, that many planners run in parallel and the first
+    route found within timeout seconds (mode "first") or the shortest one
+    (mode "best") is returned.
+    """
+    if not isinstance(grid, Grid):
+        occupancy = np.load(grid) if isinstance(grid, str) else np.asarray(grid)
+        grid = Grid(len(occupancy), occupancy)
+    if workers > 1:
+        from planning.parallel import ParallelPlanner
+
+        parallel = ParallelPlanner(grid, start, goal, planner, workers, **params)
+        return parallel.plan(timeout or 5.0, mode, seed)
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    planner = PLANNERS[planner](grid, tuple(start), tuple(goal), **params)
+    planner.anytime = anytime
+    deadline = np.inf if timeout is None else time.perf_counter() + timeout
+    for _ in range(iterations):
+        if planner.update() or time.perf_counter() >= deadline:
+            break
+    return planner.get_route()
+
+
+def parse_args() -> object:
+    parser = ArgumentParser(description="Plan a route on an occupancy grid")
+    parser.add_argument("grid", type=str, help="Occupancy grid (.npy)")
+    parser.add_argument("--start", nargs=3, type=float, required=True, metavar=("X", "Y", "YAW"))
+    parser.add_argument("--goal", nargs=3, type=float, required=True, metavar=("X", "Y", "YAW"))
+    parser.add_argument("--output", type=str, default="route.npy", help="Route file, .npy or .json")
+    parser.add_argument("--planner", type=str, default="rrt", choices=list(PLANNERS))
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="Planners run in parallel")
+    parser.add_argument("--timeout", type=float, default=None, help="Deadline, seconds")
+    parser.add_argument("--parallel-mode", type=str, default="first", choices=("first", "best"),
+                        help="Return the first route found by the workers or the shortest one")
+    parser.add_argument("--anytime", action="store_true", help="Keep improving the route (rrt*) until the deadline")
+    parser.add_argument("--lut", type=str, default=None, help="Reeds-Shepp length table")
+    parser.add_argument("--smooth", type=float, default=None, help="Seconds to shortcut the route")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    params = {}
+    if args.lut is not None:
+        from reeds_shepp.lut import ReedsSheppLUT
+
+        params["lut"] = ReedsSheppLUT.load(args.lut)
+
+    occupancy = np.load(args.grid)
+    grid = Grid(len(occupancy), occupancy)
+    t0 = time.perf_counter()
+    route = plan(
+        grid, args.start, args.goal, args.planner,
+        args.iterations, args.seed, args.workers, args.timeout, args.anytime,
+        args.parallel_mode, **params
+    )
+    elapsed = time.perf_counter() - t0
+    if args.smooth is not None and len(route):
+        route, stats = shortcut(
+            route, grid, edge_resolution(grid, 0.1, Car.width, Car.height, Car.n_disks),
+            iterations=1000, timeout=args.smooth
+        )
+        print(
+            f"shortcut: length {stats['length_before']:.3f} -> {stats['length_after']:.3f}, "
+            f"cusps {stats['cusps_before']} -> {stats['cusps_after']}, {stats['elapsed']:.3f} s"
+        )
+
+    if args.output.endswith(".json"):
+        with open(args.output, "w") as f:
+            json.dump({
+                "start": args.start,
+                "goal": args.goal,
+                "route": route.tolist(),
+            }, f)
+    else:
+        np.save(args.output, route)
+    length = np.linalg.norm(np.diff(route[:, :2], axis=0), axis=1).sum()
+    print(f"{len(route)} poses, length {length:.3f}, {elapsed:.3f} s -> {args.output}")
+    if len(route) == 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Memo of optimal Reeds-Shepp paths and edge collision verdicts shared by all
+the planners, so repeated queries on the same map skip most of the solver
+and collision work.
+"""
+
+import weakref
+from collections import OrderedDict
+
+from reeds_shepp.reeds_shepp import get_optimal_path
+
+
+class EdgeCache:
+    """
+    Bounded LRU memos keyed by (start, goal, turning radius), poses rounded
+    to quantum. Paths do not depend on the grid and are kept until they are
+    the least recently used. Verdicts are keyed by the unordered pair of
+    poses, the optimal path back sweeps the same poses, and also by the
+    footprint they were checked with. They are kept per grid and dropped
+    as soon as its version changes, i.e. a cell is added or removed.
+    """
+    def __init__(self, max_paths: int=50000, max_verdicts: int=50000,
+                 quantum: float=1e-6) -> None:
+        self.max_paths = max_paths
+        self.max_verdicts = max_verdicts
+        self.quantum = quantum
+        self.paths = OrderedDict()
+        #grid -> (grid version, OrderedDict of verdicts)
+        self.verdicts = weakref.WeakKeyDictionary()
+        self.hits = {"paths": 0, "verdicts": 0}
+        self.misses = {"paths": 0, "verdicts": 0}
+
+    def key(self, start: list, goal: list, turning_radius: float) -> tuple:
+        return (
+            *(round(v / self.quantum) for v in start),
+            *(round(v / self.quantum) for v in goal),
+            turning_radius,
+        )
+
+    def pair_key(self, start: list, goal: list, turning_radius: float) -> tuple:
+        """key of the unordered pair start, goal"""
+        a = tuple(round(v / self.quantum) for v in start)
+        b = tuple(round(v / self.quantum) for v in goal)
+        return (*min(a, b), *max(a, b), turning_radius)
+
+    def path(self, start: list, goal: list, turning_radius: float=0.1) -> object:
+        """get_optimal_path, memoized"""
+        key = self.key(start, goal, turning_radius)
+        if key in self.paths:
+            self.hits["paths"] += 1
+            self.paths.move_to_end(key)
+            return self.paths[key]
+        self.misses["paths"] += 1
+        path = get_optimal_path(start, goal, turning_radius)
+        self.paths[key] = path
+        if len(self.paths) > self.max_paths:
+            self.paths.popitem(last=False)
+        return path
+
+    def collides(self, grid: object, start: list, goal: list, check: object,
+                 turning_radius: float=0.1, footprint: tuple=()) -> bool:
+        """
+        Whether the edge between start and goal collides, either way,
+        check() on a miss.
+        footprint holds whatever else check() depends on (car dimensions,
+        check resolution...), verdicts of different footprints never mix.
+        """
+        version, verdicts = self.verdicts.get(grid, (None, None))
+        if version != grid.version:
+            verdicts = OrderedDict()
+            self.verdicts[grid] = (grid.version, verdicts)
+        key = (*self.pair_key(start, goal, turning_radius), *footprint)
+        if key in verdicts:
+            self.hits["verdicts"] += 1
+            verdicts.move_to_end(key)
+            return verdicts[key]
+        self.misses["verdicts"] += 1
+        collides = bool(check())
+        verdicts[key] = collides
+        if len(verdicts) > self.max_verdicts:
+            verdicts.popitem(last=False)
+        return collides
+
+    def stats(self) -> dict:
+        """Hits, misses and entries of both memos"""
+        return {
+            "path_hits": self.hits["paths"],
+            "path_misses": self.misses["paths"],
+            "verdict_hits": self.hits["verdicts"],
+            "verdict_misses": self.misses["verdicts"],
+            "paths": len(self.paths),
+            "verdicts": sum(len(verdicts) for _, verdicts in self.verdicts.values()),
+        }
+
+    def clear(self) -> None:
+        self.paths.clear()
+        self.verdicts.clear()
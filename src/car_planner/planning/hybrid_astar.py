@@ -0,0 +1,155 @@
+import heapq
+import math
+
+import numpy as np
+
+from car.car import Car
+from collisions.edge import trace_margin
+from collisions.footprint import footprint_collides
+from reeds_shepp.draw import advance
+from planning.planner import Planner
+
+
+class HybridAStarPlanner(Planner):
+    """
+    Hybrid A* over (i, j, yaw bin) cells of the grid. Nodes keep their
+    continuous pose and are expanded with arcs of the minimum turning radius
+    and straight lines, forwards and backwards. The heuristic is the
+    obstacle-free Reeds-Shepp length to the goal, which never overestimates
+    since reversing and gear changes only add to the cost. Every
+    shot_every expansions the node popped tries an exact Reeds-Shepp shot
+    to the goal.
+
+    The search is deterministic: the same query always gives the same route.
+    update() runs expansions_per_update expansions and returns True once
+    the goal is reached.
+    """
+    def __init__(self, grid: object, start: list, goal: list, lut: object=None,
+                 cspace: object=None, cache: object=None, yaw_bins: int=72,
+                 step: float=0.04, reverse_penalty: float=1.5,
+                 switch_penalty: float=0.1, shot_every: int=10,
+                 expansions_per_update: int=50) -> None:
+        super().__init__(grid, start, goal, lut, cspace, cache)
+        self.yaw_bins = yaw_bins
+        self.step = step
+        self.reverse_penalty = reverse_penalty
+        self.switch_penalty = switch_penalty
+        self.shot_every = shot_every
+        self.expansions_per_update = expansions_per_update
+        #Motion primitives: (signed arc length, curvature), turning radius 0.1
+        self.primitives = np.array([
+            (gear*step, curvature)
+            for gear in (1, -1)
+            for curvature in (-1/0.1, 0.0, 1/0.1)
+        ])
+        self.samples = max(1, math.ceil(step / self.resolution))
+        self.start_search()
+
+    def start_search(self) -> None:
+        self.closed = np.zeros((self.grid.res, self.grid.res, self.yaw_bins), dtype=bool)
+        self.costs = np.full(self.closed.shape, np.inf)
+        #Motion (arc length, curvature) from the parent of every tree node
+        self.motions = [(0.0, 0.0)]
+        self.open = []
+        self.expansions = 0
+        self.shot = None
+        self.failed = False
+        start_cell = self.cell(self.start)
+        if start_cell is not None:
+            self.costs[start_cell] = 0.0
+            h = float(self.path_lengths(self.start, self.goal)[0])
+            heapq.heappush(self.open, (h, 0.0, 0))
+
+    def reset(self, *, start: list=None, goal: list=None) -> None:
+        super().reset(start=start, goal=goal)
+        self.start_search()
+
+    def retarget(self, goal: list) -> None:
+        #The heuristic depends on the goal, the search starts over
+        self.reset(goal=goal)
+
+    def cell(self, pose: list) -> tuple:
+        """(i, j, yaw bin) of pose, None if it is off the grid"""
+        i, j = self.grid.ortho_to_grid(pose[0], pose[1])
+        if not (0 <= i < self.grid.res and 0 <= j < self.grid.res):
+            return None
+        k = round((pose[2] % (2*math.pi)) / (2*math.pi) * self.yaw_bins)
+        return i, j, k % self.yaw_bins
+
+    def expand(self, node: int) -> None:
+        pose = self.tree.poses[node]
+        gear = np.sign(self.motions[node][0])
+        n = len(self.primitives)
+        #Every primitive traced at the edge resolution, checked at once
+        fractions = np.arange(1, self.samples + 1) / self.samples
+        s = (self.primitives[:, 0, None] * fractions).ravel()
+        curvature = np.repeat(self.primitives[:, 1], self.samples)
+        traced = advance(np.tile(pose, (len(s), 1)), s, curvature)
+        collides = footprint_collides(
+            traced, self.grid, Car.width, Car.height, Car.n_disks,
+            trace_margin(self.grid)
+        ).reshape(n, self.samples).any(axis=1)
+        children = traced.reshape(n, self.samples, 3)[:, -1]
+
+        cost = self.tree.costs[node]
+        candidates = []
+        for (length, curvature), child, hit in zip(self.primitives, children, collides):
+            if hit:
+                continue
+            cell = self.cell(child)
+            if cell is None or self.closed[cell]:
+                continue
+            g = cost + abs(length)
+            if length < 0:
+                g += (self.reverse_penalty - 1)*abs(length)
+            if gear != 0 and np.sign(length) != gear:
+                g += self.switch_penalty
+            if g >= self.costs[cell]:
+                continue
+            self.costs[cell] = g
+            candidates.append((g, child, length, curvature))
+        if not candidates:
+            return
+        h = self.path_lengths(np.array([c[1] for c in candidates]), self.goal)
+        for (g, child, length, curvature), h_child in zip(candidates, h):
+            child_id = self.tree.append(node, child, g - cost)
+            self.index.add(child)
+            self.motions.append((length, curvature))
+            heapq.heappush(self.open, (g + h_child, g, child_id))
+
+    def update(self) -> bool:
+        if self.shot is not None:
+            return True
+        for _ in range(self.expansions_per_update):
+            if not self.open:
+                self.failed = True
+                return False
+            _, g, node = heapq.heappop(self.open)
+            pose = self.tree.poses[node]
+            cell = self.cell(pose)
+            if self.closed[cell] or g > self.costs[cell]:
+                continue
+            self.closed[cell] = True
+            self.expansions += 1
+
+            if (self.expansions - 1) % self.shot_every == 0 or self.close_enough(pose, 0.1):
+                path = self.connect(pose, self.goal)
+                if path is not None:
+                    self.shot = path
+                    self.goal_id = node
+                    return True
+            self.expand(node)
+        return False
+
+    def trace_route(self, ids: tuple) -> np.ndarray:
+        poses = [self.tree.poses[list(ids[:1])]]
+        for node in ids[1:]:
+            length, curvature = self.motions[node]
+            parent = self.tree.poses[self.tree.parents[node]]
+            samples = max(1, math.ceil(abs(length) / 0.01))
+            s = length * np.arange(1, samples + 1) / samples
+            poses.append(advance(
+                np.tile(parent, (samples, 1)), s, np.full(samples, curvature)
+            ))
+        poses.append(self.shot.get_poses()[1:])
+        return np.concatenate(poses)
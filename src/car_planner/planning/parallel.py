@@ -0,0 +1,193 @@
+"""
+Parallel planning: K planners with different seeds, one per process. The
+occupancy grid and its derived caches (inflated maps, C-space, Reeds-Shepp
+table) are shared through multiprocessing.shared_memory, workers map them
+instead of receiving pickled copies.
+"""
+
+import gc
+import os
+import time
+import random
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from queue import Empty
+
+import numpy as np
+
+from car.car import Car
+from collisions.grid import Grid
+from collisions.cspace import CSpace
+
+
+def share(array: np.ndarray) -> tuple:
+    """Copy array into a new shared memory block, returns (block, spec)"""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach(spec: tuple) -> tuple:
+    """Map the array shared with spec, returns (block, array)"""
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype, buffer=block.buf)
+
+
+def worker(specs: dict, config: dict, seed: int, deadline: float,
+           stop: object, results: object) -> None:
+    blocks = []
+    arrays = {}
+    try:
+        for key, spec in specs.items():
+            block, arrays[key] = attach(spec)
+            blocks.append(block)
+        run(arrays, config, seed, deadline, stop, results)
+    finally:
+        #The views into the blocks must be gone before they are closed
+        arrays.clear()
+        gc.collect()
+        for block in blocks:
+            block.close()
+
+
+def run(arrays: dict, config: dict, seed: int, deadline: float,
+        stop: object, results: object) -> None:
+    """Plan on the attached arrays, puts the route found or None in results"""
+    from plan import PLANNERS
+
+    grid = Grid(config["res"], arrays.pop("grid"))
+    cspace = CSpace(
+        grid, Car.width, Car.height, Car.n_disks,
+        config["yaw_bins"], arrays.pop("cspace")
+    )
+    params = dict(config["params"])
+    if "lut" in arrays:
+        from reeds_shepp.lut import ReedsSheppLUT
+
+        params["lut"] = ReedsSheppLUT(arrays.pop("lut"), *config["lut"])
+    for key, inflated in arrays.items():
+        grid.inflated[int(key.split(":")[1])] = inflated
+
+    #Unseeded, every worker draws fresh entropy: forked ones would all
+    #carry on the state of the parent otherwise
+    random.seed(seed)
+    np.random.seed(seed)
+    planner = PLANNERS[config["planner"]](
+        grid, config["start"], config["goal"], cspace=cspace, **params
+    )
+    t0 = time.perf_counter()
+    iterations = 0
+    while not stop.is_set() and time.monotonic() < deadline:
+        iterations += 1
+        if planner.update():
+            route = planner.get_route()
+            length = np.linalg.norm(np.diff(route[:, :2], axis=0), axis=1).sum()
+            results.put({
+                "seed": seed,
+                "route": route,
+                "length": float(length),
+                "iterations": iterations,
+                "time": time.perf_counter() - t0,
+            })
+            return
+    results.put(None)
+
+
+class ParallelPlanner:
+    """
+    Runs workers planners of the given kind, seeded seed, seed + 1, ...
+    (unseeded if seed is None), in separate processes. plan() returns the first route found (mode
+    "first") or the shortest one found before the deadline (mode "best").
+    """
+    def __init__(self, grid: Grid, start: list, goal: list, planner: str="rrt",
+                 workers: int=None, cspace: CSpace=None, lut: object=None,
+                 **params) -> None:
+        self.grid = grid
+        self.start = tuple(start)
+        self.goal = tuple(goal)
+        self.planner = planner
+        self.workers = workers or os.cpu_count()
+        self.cspace = cspace or CSpace.of(grid, Car.width, Car.height, Car.n_disks)
+        self.lut = lut
+        self.params = params
+        self.results = []
+
+    def shared_arrays(self) -> dict:
+        arrays = {
+            "grid": self.grid.occupancy,
+            "cspace": self.cspace.occupancy,
+        }
+        for r, inflated in self.grid.inflated.items():
+            arrays[f"inflated:{r}"] = inflated
+        if self.lut is not None:
+            arrays["lut"] = self.lut.table
+        return arrays
+
+    def plan(self, timeout: float=5.0, mode: str="first", seed: int=None) -> np.ndarray:
+        """
+        (N, 3) route, empty if no worker finds one within timeout seconds.
+        Every result received is kept in self.results.
+        """
+        config = {
+            "res": self.grid.res,
+            "yaw_bins": self.cspace.yaw_bins,
+            "planner": self.planner,
+            "start": self.start,
+            "goal": self.goal,
+            "params": self.params,
+        }
+        if self.lut is not None:
+            config["lut"] = (self.lut.extent, self.lut.turning_radius)
+
+        blocks = []
+        specs = {}
+        for key, array in self.shared_arrays().items():
+            block, specs[key] = share(array)
+            blocks.append(block)
+
+        deadline = time.monotonic() + timeout
+        stop = mp.Event()
+        results = mp.Queue()
+        processes = [
+            mp.Process(
+                target=worker,
+                args=(specs, config, None if seed is None else seed + k,
+                      deadline, stop, results),
+                daemon=True,
+            )
+            for k in range(self.workers)
+        ]
+        self.results = []
+        try:
+            for process in processes:
+                process.start()
+            pending = len(processes)
+            while pending:
+                try:
+                    result = results.get(timeout=max(deadline - time.monotonic(), 0) + 0.1)
+                except Empty:
+                    break
+                pending -= 1
+                if result is None:
+                    continue
+                self.results.append(result)
+                if mode == "first":
+                    break
+        finally:
+            #Cancel the workers still planning
+            stop.set()
+            for process in processes:
+                process.join(timeout=0.5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        if not self.results:
+            return np.empty((0, 3))
+        best = min(self.results, key=lambda result: result["length"])
+        return best["route"]
@@ -1,94 +1,162 @@
 import random
 import math
+import time
 
 import numpy as np
 
 from car.car import Car
-from reeds_shepp.reeds_shepp import get_optimal_path, path_length
+from reeds_shepp.reeds_shepp import get_optimal_path, optimal_path_length, path_length
+from reeds_shepp.batch import optimal_path_lengths
 from reeds_shepp.draw import trace_path_points
-import gridsim.glutils as GLUtils
 from planning.tree import Tree
-
-
-def distance(a: list, b: list) -> float:
-    acc = 0.0
-    for i in range(len(a)):
-        acc += (a[i] - b[i])**2
-    d = acc**0.5
-    return d
+from planning.cache import EdgeCache
+from planning.spatial import SpatialIndex
+from collisions.cspace import CSpace
+from collisions.edge import edge_collides, edge_resolution
 
 
 class Path:
+    """
+    Reeds-Shepp path from start. Its poses traced at route_resolution are
+    kept once traced, the route is made of them.
+    """
+    route_resolution = 0.01
+
     def __init__(self, start: list, path: object) -> None:
         self.start = start
         self.path = path
+        self.poses = None
 
     @property
     def length(self) -> float:
+        #No path between identical poses
+        if self.path is None:
+            return 0.0
         return path_length(self.path)
 
     @classmethod
-    def optimal_path(cls, start: list, goal: list) -> "Path":
-        path = get_optimal_path(start, goal, 0.1)
+    def optimal_path(cls, start: list, goal: list, cache: EdgeCache=None) -> "Path":
+        if cache is None:
+            path = get_optimal_path(start, goal, 0.1)
+        else:
+            path = cache.path(start, goal, 0.1)
         object = cls(start, path)
         return object
 
     def draw(self, **kwargs) -> None:
+        import gridsim.glutils as GLUtils
+
         poses = self.get_poses()
-        pts = np.array([[x, y] for x, y, _ in poses])
-        GLUtils.draw_line(pts, **kwargs)
+        GLUtils.draw_line(poses[:, :2], **kwargs)
 
-    def get_poses(self) -> list:
-        return trace_path_points(self.path, self.start, 0.1)
+    def get_poses(self, resolution: float=0.01) -> np.ndarray:
+        if resolution != self.route_resolution:
+            return trace_path_points(self.path, self.start, 0.1, resolution)
+        if self.poses is None:
+            self.poses = trace_path_points(self.path, self.start, 0.1, resolution)
+        return self.poses
 
 class Planner:
-    def __init__(self, grid: object, start: list, goal: list) -> None:
+    #Anytime planners keep improving their route, update() never finishes
+    anytime = False
+    #Fewer pairs are solved one by one, cheaper than the fixed cost of a batch
+    scalar_pairs = 24
+
+    def __init__(self, grid: object, start: list, goal: list, lut: object=None,
+                 cspace: CSpace=None, cache: EdgeCache=None) -> None:
         self.grid = grid
+        self.lut = lut
+        self.cspace = cspace or CSpace.of(grid, Car.width, Car.height, Car.n_disks)
+        #Edge verdicts shared with other planners, edges are only checked
+        #again when planners repeat each other's work
+        self.cache = cache
+        self.resolution = edge_resolution(
+            grid, 0.1, Car.width, Car.height, Car.n_disks
+        )
+        #Everything but the grid and the edge a verdict depends on
+        self.footprint = (self.resolution, Car.width, Car.height, Car.n_disks)
         self.start = start
         self.goal = goal
-        self.milestones = [start]
+        self.index = SpatialIndex()
+        self.index.add(start)
         self.tree = Tree(start)
+        self.goal_id = None
+        #(route ids, poses) of the last route traced
+        self.traced_route = None
+        #Free poses drawn in batches from the C-space
+        self.sample_pool = np.empty((0, 3))
+        self.sample_pool_version = None
+        #Vertex buffers by name, created on the first draw
+        self.layers = {}
 
     def reset(self, *, start: list=None, goal: list=None) -> None:
         if start is not None:
             self.start = start
         if goal is not None:
             self.goal = goal
-        self.milestones = [self.start]
+        self.index = SpatialIndex()
+        self.index.add(self.start)
         self.tree = Tree(self.start)
+        self.goal_id = None
+        self.traced_route = None
+
+    def retarget(self, goal: list) -> None:
+        """
+        Plan towards a new goal from the same start, keeping the tree. A
+        milestone already close enough to goal becomes the route end.
+        """
+        self.goal = goal
+        self.goal_id = None
+        close = self.close_ids(0.04)
+        if len(close):
+            self.goal_id = int(close[0])
+            self.goal = tuple(self.milestones[self.goal_id])
+
+    @property
+    def milestones(self) -> np.ndarray:
+        return self.tree.poses
 
     def pose_collides(self, pose: list) -> bool:
-        x, y, yaw = pose
-        car = Car(x, y, yaw)
-        return car.collides(self.grid)
+        return self.cspace.pose_collides(pose)
 
-    def sample(self) -> list:
+    def sample(self, batch: int=64, target: list=None) -> list:
+        """Free pose, a quarter of them drawn around target (the goal by default)"""
         if random.random() > 0.75:
-            almost_goal = list(np.random.normal(self.goal, (.1, .1, 0.2)))
+            target = self.goal if target is None else target
+            almost_goal = list(np.random.normal(target, (.1, .1, 0.2)))
             return almost_goal
-        while True:
-            x, y, yaw = np.random.uniform(-1, 1, 3)
-            if self.pose_collides((x, y, yaw)):
-                continue
-            return x, y, yaw
-
-    def nearest(self, sample: list, r: float = 0.5) -> list:
-        #Find in a ball
-        near = [
-            vertex for vertex in self.milestones
-            if distance(vertex, sample) < r
-        ]
-        if not near:
-            return []
-        #Optimal path
-        min_dist = np.inf
-        nearest_v = None
-        for vertex in near:
-            dist = Path.optimal_path(vertex, sample).length
-            if  dist < min_dist:
-                min_dist = dist
-                nearest_v = vertex
-        return nearest_v
+        stale = self.sample_pool_version != self.cspace.version
+        if stale or len(self.sample_pool) == 0:
+            self.sample_pool = self.cspace.sample(batch)
+            self.sample_pool_version = self.cspace.version
+        x, y, yaw = self.sample_pool[-1]
+        self.sample_pool = self.sample_pool[:-1]
+        return x, y, yaw
+
+    def nearest(self, sample: list, r: float = 0.5, k: int = 64) -> int:
+        """Id of the nearest milestone, None if there is none in the ball"""
+        #Find in a ball, at most the k closest milestones
+        near = self.index.nearest(sample, k)
+        near = near[self.index.distances(near, sample) < r]
+        if len(near) == 0:
+            return None
+        #Optimal path, all the ball at once
+        lengths = self.path_lengths(self.index.poses[near], sample)
+        return int(near[int(np.argmin(lengths))])
+
+    def path_lengths(self, starts: np.ndarray, goals: np.ndarray) -> np.ndarray:
+        """Optimal path lengths, from the lookup table when there is one"""
+        if self.lut is not None:
+            return self.lut.lengths(starts, goals)
+        starts = np.atleast_2d(np.asarray(starts, dtype=float))
+        goals = np.atleast_2d(np.asarray(goals, dtype=float))
+        starts, goals = np.broadcast_arrays(starts, goals)
+        if len(starts) < self.scalar_pairs:
+            return np.array(
+                [optimal_path_length(start, goal, 0.1) for start, goal in zip(starts, goals)],
+                dtype=float
+            )
+        return optimal_path_lengths(starts, goals, 0.1)
 
     def steer(self, vertex: list, sample: list, step_size = 0.2) -> None:
         dx = sample[0] - vertex[0]
@@ -107,69 +175,166 @@ class Planner:
         new_sample = (new_x, new_y, sample[2])
         return new_sample
 
+    def connect(self, start: list, end: list) -> Path:
+        """Optimal path from start to end, None if it collides"""
+        path = None
+
+        def check() -> bool:
+            nonlocal path
+            path = Path.optimal_path(start, end)
+            return edge_collides(
+                path.get_poses(self.resolution), self.grid,
+                Car.width, Car.height, Car.n_disks
+            )
+
+        if self.cache is None:
+            collides = check()
+        else:
+            collides = self.cache.collides(self.grid, start, end, check, 0.1, self.footprint)
+        if collides:
+            return None
+        #A known verdict skips the solver unless the edge is free
+        return path or Path.optimal_path(start, end)
+
     def path_collides(self, start: list, end: list) -> bool:
-        path = Path.optimal_path(start, end)
-        for pose in path.get_poses():
-            if self.pose_collides(pose):
-                return True
-        return False
+        return self.connect(start, end) is None
 
     def update(self) -> bool:
+        if self.goal_id is not None:
+            return True
         sample = self.sample()
         nearest = self.nearest(sample, )
-        if not nearest:
+        if nearest is None:
             return False
-        sample = self.steer(nearest, sample, 0.15)
-        if self.path_collides(nearest, sample):
+        vertex = self.milestones[nearest]
+        sample = self.steer(vertex, sample, 0.15)
+        path = self.connect(vertex, sample)
+        if path is None:
             return False
-        self.milestones.append(sample)
-        parent_node = self.tree.find(nearest)
-        parent_node.append(sample)
+        self.index.add(sample)
+        node_id = self.tree.append(nearest, sample, path.length, path)
         finished = self.close_enough(sample, 0.04)
         if finished:
             self.goal = sample
+            self.goal_id = node_id
         return finished
 
-    def draw_tree(self, start_node=None) -> None:
-        current = start_node or self.tree.root
-        for child in current.children:
-            #path = Path.optimal_path(current.data, child.data)
-            #path.draw(size=2, color=(0.96, 0.5, 0.6, 1.0))
-            self.draw_tree(child)
+    def plan_until(self, deadline: float) -> dict:
+        """
+        Run update() until it finishes or time.perf_counter() passes
+        deadline, at least once. Returns the progress made.
+        """
+        t0 = time.perf_counter()
+        iterations = 0
+        finished = False
+        while not finished:
+            finished = self.update()
+            iterations += 1
+            if time.perf_counter() >= deadline:
+                break
+        return {
+            "finished": finished,
+            "solved": self.goal_id is not None,
+            "iterations": iterations,
+            "nodes": len(self.tree),
+            "elapsed": time.perf_counter() - t0,
+        }
+
+    def plan_for(self, budget: float) -> dict:
+        """plan_until, budget seconds from now"""
+        return self.plan_until(time.perf_counter() + budget)
+
+    def draw_tree(self) -> None:
+        """Tree edges as straight segments from parent to child, one layer"""
+        import gridsim.glutils as GLUtils
+
+        layer = self.layer("tree", GLUtils.GL_LINES, color=(0.96, 0.5, 0.6, 1.0))
+        #Rewiring moves edges without growing the tree
+        parents = self.tree.parents
+        version = (self.tree, len(self.tree), parents.tobytes())
+        if layer.version != version:
+            segments = np.empty((2*(len(parents) - 1), 3))
+            segments[0::2] = self.tree.poses[parents[1:]]
+            segments[1::2] = self.tree.poses[1:]
+            layer.update(segments, version)
+        layer.draw()
+
+    def layer(self, name: str, mode: int, **kwargs) -> object:
+        """Vertex buffer layer name, see gridsim.glutils.Layer"""
+        import gridsim.glutils as GLUtils
+
+        if name not in self.layers:
+            self.layers[name] = GLUtils.Layer(mode, **kwargs)
+        return self.layers[name]
 
     def draw_milestones(self) -> None:
-        for x, y, _ in self.milestones:
-            GLUtils.draw_point(x, y, size=3)
-
-    def get_route(self) -> list:
-        current = self.tree.find(self.goal)
-        if current is None:
-            return []
-        rev_hierarchy = [current.data]
-        while current.parent is not None:
-            current = current.parent
-            rev_hierarchy.append(current.data)
-        hierarchy = rev_hierarchy[::-1]
-
-        poses = []
-        for i in range(len(hierarchy) - 1):
-            current_path = Path.optimal_path(hierarchy[i], hierarchy[i+1])
-            poses += current_path.get_poses()
-
-        return poses
+        import gridsim.glutils as GLUtils
+
+        #Uploaded again only when the tree grows or is replaced
+        layer = self.layer("milestones", GLUtils.GL_POINTS, size=3)
+        layer.update(self.milestones, (self.tree, len(self.tree)))
+        layer.draw()
+
+    def get_route(self) -> np.ndarray:
+        """
+        Poses from the start to the goal. The route is traced once and
+        kept until the nodes on it change, drawing it every frame is free.
+        """
+        if self.goal_id is None:
+            return np.empty((0, 3))
+        hierarchy = tuple(self.tree.route_ids(self.goal_id))
+        if self.traced_route is None or self.traced_route[0] != hierarchy:
+            self.traced_route = (hierarchy, self.trace_route(hierarchy))
+        return self.traced_route[1]
+
+    def trace_route(self, hierarchy: tuple) -> np.ndarray:
+        """Poses along the tree edges between the node ids in hierarchy"""
+        poses = [self.tree.poses[list(hierarchy[:1])]]
+        for parent, child in zip(hierarchy[:-1], hierarchy[1:]):
+            current_path = self.edge_path(parent, child)
+            poses.append(current_path.get_poses()[1:])
+
+        return np.concatenate(poses)
+
+    def smooth_route(self, iterations: int=100, timeout: float=None) -> tuple:
+        """get_route() shortcut, see planning.smoothing.shortcut"""
+        from planning.smoothing import shortcut
+
+        return shortcut(self.get_route(), self.grid, self.resolution, iterations, timeout)
+
+    def edge_path(self, parent: int, child: int) -> Path:
+        """Path of the tree edge from node parent to node child"""
+        path = self.tree.paths[child]
+        if path is None or self.tree.parents[child] != parent:
+            return Path.optimal_path(
+                self.tree.poses[parent], self.tree.poses[child], self.cache
+            )
+        return path
 
     def draw_route(self) -> None:
+        import gridsim.glutils as GLUtils
+
+        #get_route() returns the same array until the route changes
         route = self.get_route()
-        if route == []:
-            return
-        pts = [(x, y) for x,y,_ in route]
-        GLUtils.draw_line(pts, size=3, color=(0.52, 0.11, 0.24, 1))
+        layer = self.layer(
+            "route", GLUtils.GL_LINE_STRIP, size=3, color=(0.52, 0.11, 0.24, 1)
+        )
+        layer.update(route, route)
+        layer.draw()
 
     def draw(self) -> None:
-        self.draw_tree()
         self.draw_route()
         self.draw_milestones()
 
+    def close_ids(self, th: float=0.2) -> np.ndarray:
+        """Ids of the milestones close_enough to the goal, closest first"""
+        diff = self.milestones - np.asarray(self.goal, dtype=float)
+        weighed_d = np.sqrt(
+            diff[:, 0]**2 + diff[:, 1]**2 + 0.001*diff[:, 2]**2
+        )
+        close = np.flatnonzero(weighed_d < th)
+        return close[np.argsort(weighed_d[close], kind="stable")]
+
     def close_enough(self, sample: list, th: float=0.2) -> bool:
         goal_x, goal_y, goal_yaw = self.goal
         x, y, yaw = sample
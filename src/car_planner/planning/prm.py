@@ -0,0 +1,368 @@
+"""
+Probabilistic roadmap: collision-free poses joined by validated optimal
+Reeds-Shepp edges, built once per grid and searched with A* per query.
+
+Build (and cache) the roadmap of the repository grid with:
+    python -m planning.prm [--samples 1000] [--workers 4]
+"""
+
+import os
+import heapq
+import hashlib
+import multiprocessing as mp
+from argparse import ArgumentParser
+
+import numpy as np
+
+from car.car import Car
+from collisions.grid import Grid
+from collisions.edge import edges_collide
+from reeds_shepp.batch import get_optimal_paths_batch, path_from_word
+from reeds_shepp.draw import trace_paths, trace_path_points
+from planning.planner import Planner
+from planning.spatial import SpatialIndex
+
+
+#Bumped whenever the edge checks change, so saved roadmaps are rebuilt
+FORMAT = 3
+
+
+def grid_hash(grid: Grid) -> str:
+    """Hash of the grid, and of the format the roadmap edges were checked with"""
+    sha = hashlib.sha1(np.ascontiguousarray(grid.occupancy).tobytes())
+    sha.update(f"format {FORMAT}".encode())
+    return sha.hexdigest()
+
+
+_grid = None
+
+
+def _init_worker(occupancy: np.ndarray) -> None:
+    global _grid
+    _grid = Grid(len(occupancy), occupancy)
+
+
+def _edges_collide(args: tuple) -> np.ndarray:
+    starts, words, params, resolution = args
+    return edges_collide(
+        _grid, starts, words, params, resolution, Car.width, Car.height, Car.n_disks
+    )
+
+
+class Roadmap:
+    """
+    Nodes are (N, 3) poses. Edges are undirected, edge e joins src[e] to
+    dst[e] with the Reeds-Shepp path (words[e], params[e]) of length
+    lengths[e]; it is driven backwards from dst[e] to src[e].
+    """
+    def __init__(self, poses: np.ndarray, src: np.ndarray, dst: np.ndarray,
+                 words: np.ndarray, params: np.ndarray, lengths: np.ndarray,
+                 key: str=None) -> None:
+        self.poses = poses
+        self.src = src
+        self.dst = dst
+        self.words = words
+        self.params = params
+        self.lengths = lengths
+        self.key = key
+        self.index = SpatialIndex()
+        for pose in poses:
+            self.index.add(pose)
+
+        #Adjacency in CSR form, every edge both ways
+        nodes = np.concatenate([src, dst])
+        order = np.argsort(nodes, kind="stable")
+        self.neighbours = np.concatenate([dst, src])[order]
+        self.edge_ids = np.concatenate([np.arange(len(src))]*2)[order]
+        self.indptr = np.searchsorted(nodes[order], np.arange(len(poses) + 1))
+        #Plain lists for the search loop, NumPy scalars are slow there
+        weights = np.asarray(lengths, dtype=float)[self.edge_ids].tolist()
+        neighbours = self.neighbours.tolist()
+        self.adjacency = [
+            list(zip(neighbours[lo:hi], weights[lo:hi]))
+            for lo, hi in zip(self.indptr[:-1], self.indptr[1:])
+        ]
+
+    def __len__(self) -> int:
+        return len(self.poses)
+
+    @classmethod
+    def build(cls, planner: Planner, n_samples: int=1000, k: int=10, r: float=0.4,
+              workers: int=1, chunk: int=512) -> "Roadmap":
+        """
+        Sample n_samples free poses from the C-space of planner and join each
+        of them to its k closest poses within r. Edges are validated in
+        chunks, by workers processes if workers > 1.
+        """
+        poses = planner.cspace.sample(n_samples)
+
+        index = SpatialIndex()
+        for pose in poses:
+            index.add(pose)
+        pairs = set()
+        for i, pose in enumerate(poses):
+            near = index.nearest(pose, k + 1)
+            near = near[index.distances(near, pose) < r]
+            pairs.update((min(i, j), max(i, j)) for j in near if j != i)
+        pairs = np.array(sorted(pairs), dtype=np.int32).reshape(-1, 2)
+        src, dst = pairs[:, 0], pairs[:, 1]
+
+        words, params, lengths = get_optimal_paths_batch(poses[src], poses[dst], 0.1)
+        tasks = [
+            (poses[src[i: i + chunk]], words[i: i + chunk],
+             params[i: i + chunk], planner.resolution)
+            for i in range(0, len(src), chunk)
+        ]
+        if workers > 1:
+            with mp.Pool(workers, _init_worker, (planner.grid.occupancy,)) as pool:
+                collides = pool.map(_edges_collide, tasks)
+        else:
+            collides = [
+                edges_collide(planner.grid, *task, Car.width, Car.height, Car.n_disks)
+                for task in tasks
+            ]
+        valid = ~np.concatenate(collides) & (words >= 0)
+
+        return cls(
+            poses, src[valid], dst[valid], words[valid].astype(np.int8),
+            params[valid].astype(np.float32), lengths[valid].astype(np.float32),
+            grid_hash(planner.grid)
+        )
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path, poses=self.poses, src=self.src, dst=self.dst,
+            words=self.words, params=self.params, lengths=self.lengths,
+            key=self.key
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Roadmap":
+        data = np.load(path)
+        return cls(
+            data["poses"], data["src"], data["dst"], data["words"],
+            data["params"], data["lengths"], str(data["key"])
+        )
+
+    @classmethod
+    def cached(cls, planner: Planner, directory: str, **params) -> "Roadmap":
+        """
+        Roadmap of the grid of planner, loaded from directory if it was
+        already built for that grid (the file name is the grid hash),
+        otherwise built with params and saved there.
+        """
+        key = grid_hash(planner.grid)
+        path = os.path.join(directory, f"prm_{key[:16]}.npz")
+        if os.path.exists(path):
+            roadmap = cls.load(path)
+            if roadmap.key == key:
+                return roadmap
+        roadmap = cls.build(planner, **params)
+        roadmap.save(path)
+        return roadmap
+
+    def route_poses(self, nodes: list, resolution: float=0.01) -> np.ndarray:
+        """Traced poses along the edges joining nodes, all traced at once"""
+        edges = []
+        reverse = []
+        for a, b in zip(nodes[:-1], nodes[1:]):
+            edge, backwards = self.edge_between(a, b)
+            edges.append(edge)
+            reverse.append(backwards)
+        paths = [
+            path_from_word(self.words[edge], self.params[edge].astype(float))
+            for edge in edges
+        ]
+        points, offsets = trace_paths(paths, self.poses[self.src[edges]], 0.1, resolution)
+        poses = [self.poses[nodes[:1]]]
+        for k, backwards in enumerate(reverse):
+            edge_poses = points[offsets[k]: offsets[k + 1]]
+            poses.append(edge_poses[::-1][1:] if backwards else edge_poses[1:])
+        return np.concatenate(poses)
+
+    def search(self, sources: dict, targets: dict, goal: list) -> list:
+        """
+        A* from the nodes in sources (node -> cost to reach it) to any node
+        of targets (node -> cost to leave from it). The heuristic is the
+        straight line distance to goal, shorter than any path.
+        Returns the nodes of the cheapest route, empty if there is none.
+        """
+        h = np.hypot(*(self.poses[:, :2] - np.asarray(goal[:2])).T).tolist()
+        end = len(self)
+        h.append(0.0)
+        costs = [np.inf]*(end + 1)
+        parents = [-1]*(end + 1)
+        closed = [False]*(end + 1)
+        heap = []
+        for node, cost in sources.items():
+            if cost < costs[node]:
+                costs[node] = cost
+                heapq.heappush(heap, (cost + h[node], node))
+        while heap:
+            _, node = heapq.heappop(heap)
+            if closed[node]:
+                continue
+            if node == end:
+                break
+            closed[node] = True
+            cost = costs[node]
+            if node in targets:
+                total = cost + targets[node]
+                if total < costs[end]:
+                    costs[end] = total
+                    parents[end] = node
+                    heapq.heappush(heap, (total, end))
+            for neighbour, weight in self.adjacency[node]:
+                total = cost + weight
+                if total < costs[neighbour]:
+                    costs[neighbour] = total
+                    parents[neighbour] = node
+                    heapq.heappush(heap, (total + h[neighbour], neighbour))
+        if parents[end] < 0:
+            return []
+        nodes = [parents[end]]
+        while parents[nodes[-1]] >= 0:
+            nodes.append(parents[nodes[-1]])
+        return nodes[::-1]
+
+    def edge_between(self, a: int, b: int) -> tuple:
+        """(edge id, reverse) of the edge from node a to node b"""
+        lo, hi = self.indptr[a], self.indptr[a + 1]
+        edge = int(self.edge_ids[lo + np.flatnonzero(self.neighbours[lo:hi] == b)[0]])
+        return edge, self.src[edge] != a
+
+
+class PRMPlanner(Planner):
+    """
+    Planner answering queries on a Roadmap: start and goal are joined to
+    their closest roadmap nodes and the roadmap is searched with A*. The
+    roadmap is loaded (or built) once per grid and process.
+    """
+    roadmaps = {}
+
+    def __init__(self, grid: object, start: list, goal: list, lut: object=None,
+                 cspace: object=None, cache: object=None, roadmap: Roadmap=None,
+                 directory: str=None, k: int=8) -> None:
+        super().__init__(grid, start, goal, lut, cspace, cache)
+        self.k = k
+        if roadmap is None:
+            key = grid_hash(grid)
+            roadmap = PRMPlanner.roadmaps.get(key)
+            if roadmap is None:
+                if directory is None:
+                    from utils.utils import git_root
+
+                    directory = git_root()
+                roadmap = Roadmap.cached(self, directory)
+                PRMPlanner.roadmaps[key] = roadmap
+        self.roadmap = roadmap
+        self.route = None
+
+    def reset(self, *, start: list=None, goal: list=None) -> None:
+        super().reset(start=start, goal=goal)
+        self.route = None
+
+    def retarget(self, goal: list) -> None:
+        self.goal = goal
+        self.goal_id = None
+        self.route = None
+
+    def links(self, pose: list, reverse: bool) -> tuple:
+        """
+        Collision free paths between pose and its k closest nodes, from
+        pose or to pose when reverse is set, all solved and checked at
+        once. Returns (costs, paths) dicts keyed by node, paths holding
+        (path, start pose).
+        """
+        near = self.roadmap.index.nearest(pose, 4*self.k)
+        nodes = self.roadmap.poses[near]
+        pose = np.asarray(pose, dtype=float)
+        starts, ends = (nodes, pose) if reverse else (pose, nodes)
+        starts, ends = np.broadcast_arrays(starts, ends)
+        words, params, lengths = get_optimal_paths_batch(starts, ends, 0.1)
+        valid = ~edges_collide(
+            self.grid, starts, words, params, self.resolution,
+            Car.width, Car.height, Car.n_disks
+        )
+        valid &= (words >= 0)
+
+        costs = {}
+        paths = {}
+        for idx in np.flatnonzero(valid)[np.argsort(lengths[valid], kind="stable")][:self.k]:
+            node = int(near[idx])
+            costs[node] = float(lengths[idx])
+            paths[node] = (path_from_word(words[idx], params[idx]), starts[idx])
+        return costs, paths
+
+    def update(self) -> bool:
+        if self.route is not None:
+            return True
+        direct = self.connect(self.start, self.goal)
+        if direct is not None:
+            self.route = direct.get_poses()
+            return True
+
+        sources, start_paths = self.links(self.start, reverse=False)
+        targets, goal_paths = self.links(self.goal, reverse=True)
+        nodes = self.roadmap.search(sources, targets, self.goal)
+        if not nodes:
+            #The roadmap is fixed, there is nothing else to try
+            self.route = np.empty((0, 3))
+            return True
+
+        self.route = np.concatenate([
+            trace_path_points(*start_paths[nodes[0]]),
+            self.roadmap.route_poses(nodes)[1:],
+            trace_path_points(*goal_paths[nodes[-1]])[1:],
+        ])
+        return True
+
+    def get_route(self) -> np.ndarray:
+        if self.route is None:
+            return np.empty((0, 3))
+        return self.route
+
+    def draw_milestones(self) -> None:
+        import gridsim.glutils as GLUtils
+
+        layer = self.layer(
+            "roadmap", GLUtils.GL_POINTS, size=2, color=(0.6, 0.6, 0.6, 1)
+        )
+        layer.update(self.roadmap.poses, self.roadmap.poses)
+        layer.draw()
+
+
+def parse_args() -> object:
+    parser = ArgumentParser(description="Build the roadmap of a grid")
+    parser.add_argument("--grid", type=str, default=None, help="Occupancy grid (.npy)")
+    parser.add_argument("--directory", type=str, default=None, help="Where to save it")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--neighbours", type=int, default=10)
+    parser.add_argument("--radius", type=float, default=0.4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    from utils.utils import git_root
+
+    args = parse_args()
+    if args.grid is None:
+        grid = Grid()
+    else:
+        occupancy = np.load(args.grid)
+        grid = Grid(len(occupancy), occupancy)
+    directory = args.directory or git_root()
+    np.random.seed(args.seed)
+    planner = Planner(grid, (0, 0, 0), (0, 0, 0))
+    roadmap = Roadmap.build(
+        planner, args.samples, args.neighbours, args.radius, args.workers
+    )
+    path = os.path.join(directory, f"prm_{roadmap.key[:16]}.npz")
+    roadmap.save(path)
+    print(f"{len(roadmap)} nodes, {len(roadmap.src)} edges -> {path}")
+
+
+if __name__ == "__main__":
+    main()
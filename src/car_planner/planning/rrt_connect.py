@@ -0,0 +1,146 @@
+import numpy as np
+
+from planning.planner import Planner, Path
+from planning.tree import Tree
+from planning.spatial import SpatialIndex
+
+
+class RRTConnectPlanner(Planner):
+    """
+    Bidirectional RRT: one tree grows from the start and another one from
+    the goal, taking turns. After every extension the newest milestone is
+    connected with an exact Reeds-Shepp path to the nearest milestone of the
+    other tree. The route ends exactly at the goal pose.
+
+    Edges of the goal tree are driven from child to parent, towards the
+    goal.
+    """
+    def __init__(self, grid: object, start: list, goal: list, lut: object=None,
+                 cspace: object=None, cache: object=None) -> None:
+        super().__init__(grid, start, goal, lut, cspace, cache)
+        self.goal_index = SpatialIndex()
+        self.goal_index.add(goal)
+        self.goal_tree = Tree(goal)
+        self.bridge = None
+        self.iterations = 0
+
+    def reset(self, *, start: list=None, goal: list=None) -> None:
+        super().reset(start=start, goal=goal)
+        self.goal_index = SpatialIndex()
+        self.goal_index.add(self.goal)
+        self.goal_tree = Tree(self.goal)
+        self.bridge = None
+        self.iterations = 0
+
+    def retarget(self, goal: list) -> None:
+        """New goal from the same start, only the start tree is kept"""
+        self.goal = goal
+        self.goal_id = None
+        self.traced_route = None
+        self.goal_index = SpatialIndex()
+        self.goal_index.add(goal)
+        self.goal_tree = Tree(goal)
+        self.bridge = None
+        self.iterations = 0
+
+    def closest(self, index: SpatialIndex, pose: list, reverse: bool=False,
+                r: float=np.inf, k: int=64) -> int:
+        """
+        Id of the milestone of index with the shortest path to pose, or from
+        pose when reverse is set. None if there is none closer than r.
+        """
+        near = index.nearest(pose, k)
+        near = near[index.distances(near, pose) < r]
+        if len(near) == 0:
+            return None
+        if reverse:
+            lengths = self.path_lengths(pose, index.poses[near])
+        else:
+            lengths = self.path_lengths(index.poses[near], pose)
+        return int(near[int(np.argmin(lengths))])
+
+    def extend(self, tree: Tree, index: SpatialIndex, reverse: bool) -> int:
+        """Grow tree towards a random sample, returns the new id or None"""
+        #The goal tree is rooted at the goal, it grows towards the start instead
+        sample = self.sample(target=self.start if reverse else self.goal)
+        nearest = self.closest(index, sample, reverse, r=0.5)
+        if nearest is None:
+            return None
+        vertex = tree.poses[nearest]
+        sample = self.steer(vertex, sample, 0.15)
+        if reverse:
+            path = self.connect(sample, vertex)
+        else:
+            path = self.connect(vertex, sample)
+        if path is None:
+            return None
+        index.add(sample)
+        return tree.append(nearest, sample, path.length, path)
+
+    def update(self) -> bool:
+        #Take turns: even iterations grow the start tree, odd ones the goal tree
+        reverse = self.iterations % 2 == 1
+        self.iterations += 1
+        if reverse:
+            tree, index = self.goal_tree, self.goal_index
+            other_index = self.index
+        else:
+            tree, index = self.tree, self.index
+            other_index = self.goal_index
+        new_id = self.extend(tree, index, reverse)
+        if new_id is None:
+            return False
+
+        pose = tree.poses[new_id]
+        other = self.closest(other_index, pose, not reverse)
+        if reverse:
+            start_id, goal_id = other, new_id
+        else:
+            start_id, goal_id = new_id, other
+        path = self.connect(self.tree.poses[start_id], self.goal_tree.poses[goal_id])
+        if path is None:
+            return False
+        self.bridge = (start_id, goal_id, path)
+        self.goal_id = start_id
+        self.traced_route = None
+        return True
+
+    @property
+    def cost(self) -> float:
+        """Length of the route, inf until both trees meet"""
+        if self.bridge is None:
+            return np.inf
+        start_id, goal_id, path = self.bridge
+        return (
+            self.tree.costs[start_id] + path.length +
+            self.goal_tree.costs[goal_id]
+        )
+
+    def get_route(self) -> np.ndarray:
+        if self.bridge is None:
+            return np.empty((0, 3))
+        return super().get_route()
+
+    def trace_route(self, hierarchy: tuple) -> np.ndarray:
+        start_id, goal_id, path = self.bridge
+        poses = [super().trace_route(hierarchy), path.get_poses()[1:]]
+        hierarchy = self.goal_tree.route_ids(goal_id)[::-1]
+        for child, parent in zip(hierarchy[:-1], hierarchy[1:]):
+            #Goal tree paths run from child to parent
+            edge = self.goal_tree.paths[child]
+            if edge is None:
+                edge = Path.optimal_path(
+                    self.goal_tree.poses[child], self.goal_tree.poses[parent], self.cache
+                )
+            poses.append(edge.get_poses()[1:])
+        return np.concatenate(poses)
+
+    def draw_milestones(self) -> None:
+        import gridsim.glutils as GLUtils
+
+        super().draw_milestones()
+        layer = self.layer(
+            "goal_milestones", GLUtils.GL_POINTS, size=3, color=(0.2, 0.4, 0.9, 1)
+        )
+        layer.update(self.goal_tree.poses, (self.goal_tree, len(self.goal_tree)))
+        layer.draw()
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+
+from planning.planner import Planner
+
+
+class RRTStarPlanner(Planner):
+    """
+    RRT*: every new milestone is attached to the near milestone that reaches
+    it with the lowest cost, and near milestones are rewired through it when
+    that makes them cheaper. Candidate parents and rewires are ranked with
+    path_lengths() (an estimate with a lookup table) and only solved and
+    checked in that order, through Planner.connect;
+    a candidate is only taken if its exact length is cheaper. The tree
+    keeps the path of every edge it holds.
+
+    update() keeps improving the route until max_iterations, or forever in
+    anytime mode (the caller decides when the best route is good enough).
+    history records (iteration, best cost) every time the best route improves.
+    """
+    def __init__(self, grid: object, start: list, goal: list, lut: object=None,
+                 cspace: object=None, cache: object=None, gamma: float=1.0,
+                 max_iterations: int=1500, anytime: bool=False) -> None:
+        super().__init__(grid, start, goal, lut, cspace, cache)
+        self.anytime = anytime
+        self.gamma = gamma
+        self.max_iterations = max_iterations
+        self.goal_ids = []
+        self.iterations = 0
+        self.history = []
+
+    def reset(self, *, start: list=None, goal: list=None) -> None:
+        super().reset(start=start, goal=goal)
+        self.goal_ids = []
+        self.iterations = 0
+        self.history = []
+
+    def retarget(self, goal: list) -> None:
+        """New goal from the same start, the tree is kept"""
+        self.goal = goal
+        self.goal_id = None
+        self.goal_ids = [int(id) for id in self.close_ids(0.04)]
+        self.iterations = 0
+        self.history = []
+        self.update_best()
+
+    def near_radius(self) -> float:
+        """Shrinking neighbourhood, gamma * (log n / n)^(1/3), at most 0.5"""
+        n = len(self.tree) + 1
+        return min(self.gamma * (math.log(n) / n)**(1/3), 0.5)
+
+    @property
+    def best_cost(self) -> float:
+        if self.goal_id is None:
+            return math.inf
+        return float(self.tree.costs[self.goal_id])
+
+    def update(self) -> bool:
+        self.iterations += 1
+        self.extend()
+        if self.anytime:
+            return False
+        return self.goal_id is not None and self.iterations >= self.max_iterations
+
+    def plan_until(self, deadline: float) -> dict:
+        stats = super().plan_until(deadline)
+        stats["cost"] = self.best_cost
+        return stats
+
+    def extend(self) -> int:
+        """One RRT* iteration, returns the id of the new milestone or None"""
+        sample = self.sample()
+        nearest = self.nearest(sample)
+        if nearest is None:
+            return None
+        vertex = self.milestones[nearest]
+        sample = self.steer(vertex, sample, 0.15)
+        path = self.connect(vertex, sample)
+        if path is None:
+            return None
+
+        #Cheapest parent among the near milestones, checked in order of cost
+        near = self.index.radius(sample, self.near_radius())
+        near = near[near != nearest]
+        costs = self.tree.costs
+        through = costs[near] + self.path_lengths(self.milestones[near], sample)
+        parent, cost = nearest, costs[nearest] + path.length
+        for idx in np.argsort(through, kind="stable"):
+            if through[idx] >= cost:
+                break
+            candidate = self.connect(self.milestones[near[idx]], sample)
+            if candidate is not None and costs[near[idx]] + candidate.length < cost:
+                parent, path = int(near[idx]), candidate
+                break
+
+        node_id = self.tree.append(parent, sample, path.length, path)
+        self.index.add(sample)
+
+        #Rewire the near milestones whose cost drops going through node_id
+        near = near[near != parent]
+        costs = self.tree.costs
+        through = costs[node_id] + self.path_lengths(sample, self.milestones[near])
+        for idx in np.flatnonzero(through < costs[near]):
+            child = int(near[idx])
+            path = self.connect(sample, self.milestones[child])
+            #through is an estimate with a lookup table, check the exact cost
+            if path is not None and costs[node_id] + path.length < costs[child]:
+                self.tree.set_parent(child, node_id, path.length, path)
+
+        if self.close_enough(sample, 0.04):
+            self.goal_ids.append(node_id)
+        self.update_best()
+        return node_id
+
+    def update_best(self) -> None:
+        if not self.goal_ids:
+            return
+        costs = self.tree.costs[self.goal_ids]
+        if costs.min() < self.best_cost:
+            self.history.append((self.iterations, float(costs.min())))
+        self.goal_id = self.goal_ids[int(np.argmin(costs))]
@@ -0,0 +1,102 @@
+"""
+Route post-processing: shortcutting. Random pieces of the route are
+replaced by the optimal Reeds-Shepp path between their ends whenever that
+path is shorter and collision free, which removes most of the detours and
+cusps left by the random milestones.
+"""
+
+import time
+
+import numpy as np
+
+from car.car import Car
+from collisions.edge import edges_collide
+from reeds_shepp.batch import get_optimal_paths_batch, path_from_word
+from reeds_shepp.draw import trace_paths
+
+
+def route_length(route: np.ndarray) -> float:
+    return float(np.linalg.norm(np.diff(route[:, :2], axis=0), axis=1).sum())
+
+
+def count_cusps(route: np.ndarray) -> int:
+    """Gear changes along the route, from the sign of each step along the heading"""
+    steps = np.diff(route[:, :2], axis=0)
+    heading = route[:-1, 2]
+    along = steps[:, 0]*np.cos(heading) + steps[:, 1]*np.sin(heading)
+    gears = np.sign(along[np.abs(along) > 1e-9])
+    return int(np.count_nonzero(gears[1:] != gears[:-1]))
+
+
+def shortcut(route: np.ndarray, grid: object, resolution: float,
+             iterations: int=100, timeout: float=None, batch: int=32,
+             min_gain: float=1e-3) -> tuple:
+    """
+    Shortcut the (N, 3) route traced at 0.01. Every iteration draws batch
+    pairs of route poses (the two ends first), solves all their optimal
+    paths at once and checks the ones that shorten the route in a single
+    collision query; the non-overlapping ones with the largest gain are
+    spliced in. Stops after iterations, timeout seconds or when no pair
+    shortens the route. Returns the new route and the stats before and after.
+    """
+    t0 = time.perf_counter()
+    deadline = np.inf if timeout is None else t0 + timeout
+    stats = {"length_before": route_length(route), "cusps_before": count_cusps(route)}
+
+    done = 0
+    stale = 0
+    while done < iterations and time.perf_counter() < deadline and len(route) > 2:
+        done += 1
+        #Arc length from the route start to every pose
+        arc = np.concatenate([
+            [0.0], np.cumsum(np.linalg.norm(np.diff(route[:, :2], axis=0), axis=1))
+        ])
+        n = len(route)
+        pairs = np.sort(np.random.randint(0, n, (batch, 2)), axis=1)
+        if done == 1:
+            pairs[0] = (0, n - 1)
+        pairs = pairs[pairs[:, 1] - pairs[:, 0] > 1]
+
+        words, params, lengths = get_optimal_paths_batch(route[pairs[:, 0]], route[pairs[:, 1]])
+        gain = arc[pairs[:, 1]] - arc[pairs[:, 0]] - lengths
+        better = np.flatnonzero((gain > min_gain) & (words >= 0))
+        if len(better):
+            free = ~edges_collide(
+                grid, route[pairs[better, 0]], words[better], params[better],
+                resolution, Car.width, Car.height, Car.n_disks
+            )
+            better = better[free]
+        if len(better) == 0:
+            #A few empty rounds in a row, the route is as short as it gets
+            stale += 1
+            if stale >= 5:
+                break
+            continue
+        stale = 0
+
+        #Largest gains first, skipping the pieces that overlap a taken one
+        taken = []
+        for k in better[np.argsort(-gain[better])]:
+            i, j = pairs[k]
+            if all(j <= a or i >= b for a, b, _ in taken):
+                taken.append((i, j, k))
+        taken.sort()
+        paths = [path_from_word(words[k], params[k]) for _, _, k in taken]
+        points, offsets = trace_paths(paths, route[[i for i, _, _ in taken]], 0.1, 0.01)
+        pieces = []
+        last = 0
+        for (i, j, _), a, b in zip(taken, offsets[:-1], offsets[1:]):
+            pieces.append(route[last:i])
+            #The traced piece starts at route[i] and ends at route[j]
+            pieces.append(points[a:b])
+            last = j + 1
+        pieces.append(route[last:])
+        route = np.concatenate(pieces)
+
+    stats.update({
+        "length_after": route_length(route),
+        "cusps_after": count_cusps(route),
+        "iterations": done,
+        "elapsed": time.perf_counter() - t0,
+    })
+    return route, stats
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    Uniform grid of (x, y) buckets over SE(2) poses, updated one pose at a
+    time. Distances are sqrt(dx^2 + dy^2 + (yaw_weight * dyaw)^2), with dyaw
+    wrapped to [-pi, pi) when wrap is set.
+    """
+    def __init__(self, cell: float=0.1, yaw_weight: float=1.0, wrap: bool=True) -> None:
+        self.cell = cell
+        self.yaw_weight = yaw_weight
+        self.wrap = wrap
+        self.poses = np.empty((64, 3))
+        self.size = 0
+        self.buckets = {}
+        self.bounds = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def bucket(self, x: float, y: float) -> tuple:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def add(self, pose: list) -> int:
+        if self.size == len(self.poses):
+            self.poses = np.concatenate([self.poses, np.empty_like(self.poses)])
+        idx = self.size
+        self.poses[idx] = pose
+        self.size += 1
+
+        key = self.bucket(pose[0], pose[1])
+        self.buckets.setdefault(key, []).append(idx)
+        if self.bounds is None:
+            self.bounds = [key[0], key[1], key[0], key[1]]
+        else:
+            self.bounds[0] = min(self.bounds[0], key[0])
+            self.bounds[1] = min(self.bounds[1], key[1])
+            self.bounds[2] = max(self.bounds[2], key[0])
+            self.bounds[3] = max(self.bounds[3], key[1])
+        return idx
+
+    def distances(self, ids: np.ndarray, pose: list) -> np.ndarray:
+        diff = self.poses[ids] - np.asarray(pose, dtype=float)
+        dyaw = diff[:, 2]
+        if self.wrap:
+            dyaw = np.mod(dyaw + np.pi, 2*np.pi) - np.pi
+        return np.sqrt(
+            diff[:, 0]**2 + diff[:, 1]**2 + (self.yaw_weight*dyaw)**2
+        )
+
+    def ring(self, key: tuple, m: int) -> list:
+        """
+        Ids in the buckets at Chebyshev distance m of key
+        """
+        bx, by = key
+        min_i, min_j, max_i, max_j = self.bounds
+        cells = []
+        if m == 0:
+            cells.append((bx, by))
+        else:
+            for i in range(max(bx - m, min_i), min(bx + m, max_i) + 1):
+                cells.append((i, by - m))
+                cells.append((i, by + m))
+            for j in range(max(by - m + 1, min_j), min(by + m - 1, max_j) + 1):
+                cells.append((bx - m, j))
+                cells.append((bx + m, j))
+        ids = []
+        for cell in cells:
+            bucket = self.buckets.get(cell)
+            if bucket:
+                ids.extend(bucket)
+        return ids
+
+    def rings(self, key: tuple) -> range:
+        """
+        Rings of key that may hold buckets
+        """
+        if self.bounds is None:
+            return range(0)
+        min_i, min_j, max_i, max_j = self.bounds
+        first = max(min_i - key[0], key[0] - max_i, min_j - key[1], key[1] - max_j, 0)
+        last = max(
+            key[0] - min_i, max_i - key[0], key[1] - min_j, max_j - key[1]
+        )
+        return range(first, last + 1)
+
+    def radius(self, pose: list, r: float) -> np.ndarray:
+        """
+        Ids of the poses closer than r to pose, closest first
+        """
+        key = self.bucket(pose[0], pose[1])
+        last = math.ceil(r / self.cell)
+        ids = []
+        for m in self.rings(key):
+            if m > last:
+                break
+            ids.extend(self.ring(key, m))
+        ids = np.array(ids, dtype=int)
+        d = self.distances(ids, pose)
+        order = np.argsort(d[d < r], kind="stable")
+        return ids[d < r][order]
+
+    def nearest(self, pose: list, k: int=1) -> np.ndarray:
+        """
+        Ids of the k closest poses, closest first
+        """
+        key = self.bucket(pose[0], pose[1])
+        ids = []
+        for m in self.rings(key):
+            ids.extend(self.ring(key, m))
+            #Poses out of ring m are at least m cells away in (x, y)
+            if len(ids) >= k:
+                d = self.distances(np.array(ids, dtype=int), pose)
+                if np.partition(d, k - 1)[k - 1] <= m * self.cell:
+                    break
+        ids = np.array(ids, dtype=int)
+        d = self.distances(ids, pose)
+        order = np.argsort(d, kind="stable")[:k]
+        return ids[order]
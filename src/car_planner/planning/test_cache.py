@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+from collisions.grid import Grid
+from planning.cache import EdgeCache
+from planning.planner import Planner
+from planning.rrt_star import RRTStarPlanner
+
+
+class Check:
+    """check() for EdgeCache.collides, counts its calls"""
+    def __init__(self, collides: bool=False) -> None:
+        self.collides = collides
+        self.calls = 0
+
+    def __call__(self) -> bool:
+        self.calls += 1
+        return self.collides
+
+
+def test_verdicts_follow_the_grid_version():
+    grid = Grid(101, np.zeros((101, 101)))
+    cache = EdgeCache()
+    start, goal = (0, 0, 0), (0.2, 0.2, 0)
+    check = Check()
+    assert not cache.collides(grid, start, goal, check)
+    assert not cache.collides(grid, start, goal, check)
+    assert check.calls == 1
+
+    #Any cell added or removed drops the verdicts of the grid
+    grid.append(0.1, 0.1)
+    check.collides = True
+    assert cache.collides(grid, start, goal, check)
+    assert check.calls == 2
+    grid.pop(0.1, 0.1)
+    check.collides = False
+    assert not cache.collides(grid, start, goal, check)
+    assert check.calls == 3
+    assert cache.stats()["verdict_hits"] == 1
+
+
+def test_verdicts_are_scoped():
+    grid = Grid(101, np.zeros((101, 101)))
+    other = Grid(101, np.zeros((101, 101)))
+    cache = EdgeCache()
+    start, goal = (0, 0, 0), (0.2, 0.2, 0)
+    check = Check()
+    cache.collides(grid, start, goal, check, 0.1, (0.01, 0.1, 0.05, 2))
+    cache.collides(grid, start, goal, check, 0.1, (0.02, 0.1, 0.05, 2))
+    cache.collides(grid, start, goal, check, 0.2, (0.01, 0.1, 0.05, 2))
+    cache.collides(other, start, goal, check, 0.1, (0.01, 0.1, 0.05, 2))
+    assert check.calls == 4
+    cache.collides(grid, start, goal, check, 0.1, (0.01, 0.1, 0.05, 2))
+    assert check.calls == 4
+
+
+def test_verdicts_are_shared_both_ways():
+    grid = Grid(101, np.zeros((101, 101)))
+    cache = EdgeCache()
+    start, goal = (0, 0, 0), (0.2, 0.2, 0)
+    check = Check()
+    cache.collides(grid, start, goal, check)
+    cache.collides(grid, goal, start, check)
+    assert check.calls == 1
+
+
+def test_planners_repeating_work_hit():
+    grid = Grid()
+    cache = EdgeCache()
+    hits = []
+    misses = []
+    routes = []
+    #With the same seed RRT* draws the samples RRT drew, and its first edge
+    #to every sample is the one RRT checked. The last RRT repeats the first
+    for kind, iterations in ((Planner, 10000), (RRTStarPlanner, 200), (Planner, 10000)):
+        random.seed(0)
+        np.random.seed(0)
+        planner = kind(grid, (0, 0, 0), (0.5, 0.5, 0), cache=cache)
+        for _ in range(iterations):
+            if planner.update():
+                break
+        hits.append(cache.stats()["verdict_hits"])
+        misses.append(cache.stats()["verdict_misses"])
+        routes.append(planner.get_route())
+    assert hits[0] == 0
+    assert hits[1] > 0
+    assert misses[2] == misses[1] and hits[2] - hits[1] == misses[0]
+    assert np.array_equal(routes[0], routes[2])
+
+    #The shared verdicts are the ones the planner finds on its own
+    random.seed(0)
+    np.random.seed(0)
+    planner = Planner(grid, (0, 0, 0), (0.5, 0.5, 0))
+    while not planner.update():
+        pass
+    assert np.array_equal(planner.get_route(), routes[0])
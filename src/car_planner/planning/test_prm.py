@@ -0,0 +1,23 @@
+import numpy as np
+
+from collisions.grid import Grid
+from planning.planner import Planner
+from planning.prm import Roadmap
+
+
+def test_roadmap_round_trip(tmp_path):
+    np.random.seed(0)
+    occupancy = np.zeros((101, 101))
+    occupancy[40:60, 20:80] = 1.0
+    planner = Planner(Grid(101, occupancy), (0, 0, 0), (0, 0, 0))
+    roadmap = Roadmap.build(planner, 200, k=6)
+    assert len(roadmap.src) > 0
+
+    roadmap.save(tmp_path / "roadmap.npz")
+    loaded = Roadmap.load(tmp_path / "roadmap.npz")
+    assert loaded.key == roadmap.key
+    for name in ("poses", "src", "dst", "words", "params", "lengths"):
+        expected = getattr(roadmap, name)
+        assert getattr(loaded, name).dtype == expected.dtype
+        assert np.array_equal(getattr(loaded, name), expected)
+    assert loaded.adjacency == roadmap.adjacency
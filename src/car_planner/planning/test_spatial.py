@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from planning.spatial import SpatialIndex
+
+
+@pytest.mark.parametrize("yaw_weight, wrap", [(1.0, True), (0.1, False)])
+def test_queries_match_brute_force(yaw_weight: float, wrap: bool):
+    rng = np.random.default_rng(0)
+    poses = np.column_stack([
+        rng.uniform(-1, 1, (500, 2)), rng.uniform(-np.pi, np.pi, 500)
+    ])
+    index = SpatialIndex(0.1, yaw_weight, wrap)
+    for pose in poses:
+        index.add(pose)
+
+    everything = np.arange(len(poses))
+    #Queries inside and outside the indexed bounds
+    for query in np.column_stack([
+        rng.uniform(-1.5, 1.5, (50, 2)), rng.uniform(-np.pi, np.pi, 50)
+    ]):
+        d = index.distances(everything, query)
+        order = np.argsort(d, kind="stable")
+        for k in (1, 8, 64):
+            assert list(index.nearest(query, k)) == list(order[:k])
+        for r in (0.05, 0.3):
+            assert list(index.radius(query, r)) == list(order[d[order] < r])
@@ -0,0 +1,25 @@
+import numpy as np
+
+from planning.tree import Tree
+
+
+def test_set_parent_moves_the_subtree():
+    rng = np.random.default_rng(0)
+    tree = Tree((0, 0, 0), capacity=4)
+    for id in range(1, 200):
+        tree.append(int(rng.integers(id)), rng.uniform(-1, 1, 3), float(rng.uniform(0.1, 1)))
+    #Edge costs, to rebuild the costs from the parents
+    edges = tree.costs - tree.costs[np.maximum(tree.parents, 0)]
+
+    for _ in range(100):
+        id = int(rng.integers(1, len(tree)))
+        below = set(tree.descendants(id).tolist()) | {id}
+        parent = int(rng.choice([i for i in range(len(tree)) if i not in below]))
+        edges[id] = float(rng.uniform(0.1, 1))
+        tree.set_parent(id, parent, edges[id])
+        assert tree.parents[id] == parent
+
+        for node in range(1, len(tree)):
+            parent = tree.parents[node]
+            assert np.isclose(tree.costs[node], tree.costs[parent] + edges[node])
+            assert tree.depths[node] == tree.depths[parent] + 1
@@ -1,31 +1,171 @@
-import gridsim.glutils as GLUtils
+import numpy as np
+
 
 class Node:
-    def __init__(self, data: object, parent: object=None) -> None:
-        self.data = data
-        self.parent = parent
-        self.children = []
+    """View of the node id of a Tree"""
+    __slots__ = ("tree", "id")
+
+    def __init__(self, tree: "Tree", id: int) -> None:
+        self.tree = tree
+        self.id = id
+
+    @property
+    def data(self) -> np.ndarray:
+        return self.tree.poses[self.id]
+
+    @property
+    def parent(self) -> "Node":
+        parent = self.tree.parents[self.id]
+        return None if parent < 0 else Node(self.tree, int(parent))
+
+    @property
+    def children(self) -> list:
+        return [Node(self.tree, int(id)) for id in self.tree.children(self.id)]
+
+    @property
+    def cost(self) -> float:
+        return float(self.tree.costs[self.id])
 
-    def append(self, data: object) -> None:
-        self.children.append(Node(data, self))
+    @property
+    def depth(self) -> int:
+        return int(self.tree.depths[self.id])
 
 
 class Tree:
-    def __init__(self, root: object) -> None:
-        self.root = Node(root)  # Renamed to root
-    
+    """
+    Tree of (x, y, yaw) poses stored as arrays: pose, parent id (-1 for the
+    root), cost-to-come and depth of every node, in buffers that double
+    their capacity when full. The root is node 0. paths[id] keeps the
+    solved path of the edge from the parent of node id, if it was given.
+    """
+    def __init__(self, root: object, capacity: int=64) -> None:
+        self._poses = np.empty((capacity, 3))
+        self._parents = np.empty(capacity, dtype=int)
+        self._costs = np.empty(capacity)
+        self._depths = np.empty(capacity, dtype=int)
+        self.size = 1
+        self._poses[0] = root
+        self._parents[0] = -1
+        self._costs[0] = 0.0
+        self._depths[0] = 0
+        self.paths = [None]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, id: int) -> Node:
+        return Node(self, id)
+
+    @property
+    def root(self) -> Node:
+        return Node(self, 0)
+
+    @property
+    def poses(self) -> np.ndarray:
+        return self._poses[:self.size]
+
+    @property
+    def parents(self) -> np.ndarray:
+        return self._parents[:self.size]
+
+    @property
+    def costs(self) -> np.ndarray:
+        return self._costs[:self.size]
+
+    @property
+    def depths(self) -> np.ndarray:
+        return self._depths[:self.size]
+
+    def grow(self) -> None:
+        self._poses = np.concatenate([self._poses, np.empty_like(self._poses)])
+        self._parents = np.concatenate([self._parents, np.empty_like(self._parents)])
+        self._costs = np.concatenate([self._costs, np.empty_like(self._costs)])
+        self._depths = np.concatenate([self._depths, np.empty_like(self._depths)])
+
+    def append(self, parent: int, data: object, cost: float=0.0,
+               path: object=None) -> int:
+        """
+        Add data as a child of node parent, reached with an edge of the
+        given cost (and path). Returns its id.
+        """
+        if self.size == len(self._poses):
+            self.grow()
+        id = self.size
+        self._poses[id] = data
+        self._parents[id] = parent
+        self._costs[id] = self._costs[parent] + cost
+        self._depths[id] = self._depths[parent] + 1
+        self.paths.append(path)
+        self.size += 1
+        return id
+
+    def children(self, id: int) -> np.ndarray:
+        return np.flatnonzero(self.parents == id)
+
+    def descendants(self, id: int) -> np.ndarray:
+        """Ids of all the nodes below node id"""
+        inside = np.zeros(self.size, dtype=bool)
+        inside[id] = True
+        parents = self.parents
+        #A child always has a larger depth than its parent, add one level at a time
+        depths = self.depths
+        for depth in range(depths[id] + 1, depths.max() + 1):
+            level = np.flatnonzero(depths == depth)
+            inside[level] = inside[parents[level]]
+        inside[id] = False
+        return np.flatnonzero(inside)
+
+    def within(self, pose: object, r: float) -> np.ndarray:
+        """Ids of the nodes closer than r to pose in (x, y, yaw)"""
+        d = np.linalg.norm(self.poses - np.asarray(pose, dtype=float), axis=1)
+        return np.flatnonzero(d < r)
+
+    def set_parent(self, id: int, parent: int, cost: float, path: object=None) -> None:
+        """
+        Move node id (and its subtree) below parent, reached with an edge
+        of the given cost (and path). parent must not be in the subtree of id.
+        """
+        subtree = np.append(self.descendants(id), id)
+        self._costs[subtree] += self._costs[parent] + cost - self._costs[id]
+        self._depths[subtree] += self._depths[parent] + 1 - self._depths[id]
+        self._parents[id] = parent
+        self.paths[id] = path
+
+    def route_ids(self, id: int) -> list:
+        """Ids from the root to node id"""
+        ids = [id]
+        parents = self._parents
+        while parents[ids[-1]] >= 0:
+            ids.append(int(parents[ids[-1]]))
+        return ids[::-1]
+
+    def route(self, id: int) -> np.ndarray:
+        """Poses from the root to node id"""
+        return self._poses[self.route_ids(id)]
+
     def find(self, data: object, start_node: Node = None) -> Node:
-        """Depth-first search for node with matching data"""
-        current = start_node or self.root
-        
-        # Check current node first
-        if current.data == data:
-            return current
-        
-        # Recursively search children
-        for child in current.children:
-            found = self.find(data, child)
-            if found:
-                return found
-        
-        return None  # Not found in subtree
+        """Node with matching data, None if there is none"""
+        start = 0 if start_node is None else start_node.id
+        candidates = [start, *self.descendants(start)]
+        match = np.all(self.poses[candidates] == np.asarray(data), axis=1)
+        if not match.any():
+            return None
+        return Node(self, int(candidates[int(np.argmax(match))]))
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path, poses=self.poses, parents=self.parents,
+            costs=self.costs, depths=self.depths
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Tree":
+        data = np.load(path)
+        tree = cls(data["poses"][0], capacity=max(64, len(data["poses"])))
+        tree.size = len(data["poses"])
+        tree._poses[:tree.size] = data["poses"]
+        tree._parents[:tree.size] = data["parents"]
+        tree._costs[:tree.size] = data["costs"]
+        tree._depths[:tree.size] = data["depths"]
+        tree.paths = [None]*tree.size
+        return tree
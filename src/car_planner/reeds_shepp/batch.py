@@ -0,0 +1,318 @@
+"""
+Vectorized version of the formulas in reeds_shepp.py.
+
+Every function works on arrays of relative poses (x, y, phi), with phi in
+radians and distances normalized by the turning radius, and returns the
+signed segment parameters of its word together with a validity mask. A
+negative parameter means the gear of that segment is reversed, as in
+RSPath.
+
+Words are numbered as in reeds_shepp.WORD_STEERING.
+"""
+
+import numpy as np
+
+from .reeds_shepp import RSPath, WORD_STEERING
+
+
+MAX_SEGMENTS = 5
+
+
+def M(theta):
+    """
+    Return the angle phi = theta mod (2 pi) such that -pi <= theta < pi.
+    """
+    return np.mod(theta + np.pi, 2*np.pi) - np.pi
+
+
+def R(x, y):
+    """
+    Return the polar coordinates (r, theta) of the points (x, y).
+    """
+    return np.hypot(x, y), np.arctan2(y, x)
+
+
+def _csc_same(x, y, phi):
+    return R(x - np.sin(phi), y - 1 + np.cos(phi))
+
+
+def _csc_opposite(x, y, phi):
+    return R(x + np.sin(phi), y - 1 - np.cos(phi))
+
+
+def path1(x, y, phi):
+    """
+    Formula 8.1: CSC (same turns)
+    """
+    u, t = _csc_same(x, y, phi)
+    v = M(phi - t)
+    return [t, u, v], np.ones_like(x, dtype=bool)
+
+
+def path2(x, y, phi):
+    """
+    Formula 8.2: CSC (opposite turns)
+    """
+    phi = M(phi)
+    rho, t1 = _csc_opposite(x, y, phi)
+    valid = rho*rho >= 4
+    u = np.sqrt(rho*rho - 4)
+    t = M(t1 + np.arctan2(2, u))
+    v = M(t - phi)
+    return [t, u, v], valid
+
+
+def path3(x, y, phi):
+    """
+    Formula 8.3: C|C|C
+    """
+    rho, theta = _csc_same(x, y, phi)
+    valid = rho <= 4
+    A = np.arccos(rho / 4)
+    t = M(theta + np.pi/2 + A)
+    u = M(np.pi - 2*A)
+    v = M(phi - t - u)
+    return [t, u, v], valid
+
+
+def path4(x, y, phi):
+    """
+    Formula 8.4 (1): C|CC
+    """
+    rho, theta = _csc_same(x, y, phi)
+    valid = rho <= 4
+    A = np.arccos(rho / 4)
+    t = M(theta + np.pi/2 + A)
+    u = M(np.pi - 2*A)
+    v = M(t + u - phi)
+    return [t, u, v], valid
+
+
+def path5(x, y, phi):
+    """
+    Formula 8.4 (2): CC|C
+    """
+    rho, theta = _csc_same(x, y, phi)
+    valid = rho <= 4
+    u = np.arccos(1 - rho*rho/8)
+    A = np.arcsin(2 * np.sin(u) / rho)
+    t = M(theta + np.pi/2 - A)
+    v = M(t - u - phi)
+    return [t, u, v], valid
+
+
+def path6(x, y, phi):
+    """
+    Formula 8.7: CCu|CuC
+    """
+    rho, theta = _csc_opposite(x, y, phi)
+    valid = rho <= 4
+    near = rho <= 2
+    A = np.where(near, np.arccos((rho + 2) / 4), np.arccos((rho - 2) / 4))
+    t = M(theta + np.pi/2 + np.where(near, A, -A))
+    u = M(np.where(near, A, np.pi - A))
+    v = M(phi - t + 2*u)
+    return [t, u, u, v], valid
+
+
+def path7(x, y, phi):
+    """
+    Formula 8.8: C|CuCu|C
+    """
+    rho, theta = _csc_opposite(x, y, phi)
+    u1 = (20 - rho*rho) / 16
+    valid = (rho <= 6) & (0 <= u1) & (u1 <= 1)
+    u = np.arccos(u1)
+    A = np.arcsin(2 * np.sin(u) / rho)
+    t = M(theta + np.pi/2 + A)
+    v = M(t - phi)
+    return [t, u, u, v], valid
+
+
+def path8(x, y, phi):
+    """
+    Formula 8.9 (1): C|C[pi/2]SC
+    """
+    rho, theta = _csc_same(x, y, phi)
+    valid = rho >= 2
+    u = np.sqrt(rho*rho - 4) - 2
+    A = np.arctan2(2, u + 2)
+    t = M(theta + np.pi/2 + A)
+    v = M(t - phi + np.pi/2)
+    return [t, np.full_like(t, np.pi/2), u, v], valid
+
+
+def path9(x, y, phi):
+    """
+    Formula 8.9 (2): CSC[pi/2]|C
+    """
+    rho, theta = _csc_same(x, y, phi)
+    valid = rho >= 2
+    u = np.sqrt(rho*rho - 4) - 2
+    A = np.arctan2(u + 2, 2)
+    t = M(theta + np.pi/2 - A)
+    v = M(t - phi - np.pi/2)
+    return [t, u, np.full_like(t, np.pi/2), v], valid
+
+
+def path10(x, y, phi):
+    """
+    Formula 8.10 (1): C|C[pi/2]SC
+    """
+    rho, theta = _csc_opposite(x, y, phi)
+    valid = rho >= 2
+    t = M(theta + np.pi/2)
+    u = rho - 2
+    v = M(phi - t - np.pi/2)
+    return [t, np.full_like(t, np.pi/2), u, v], valid
+
+
+def path11(x, y, phi):
+    """
+    Formula 8.10 (2): CSC[pi/2]|C
+    """
+    rho, theta = _csc_opposite(x, y, phi)
+    valid = rho >= 2
+    t = M(theta)
+    u = rho - 2
+    v = M(phi - t - np.pi/2)
+    return [t, u, np.full_like(t, np.pi/2), v], valid
+
+
+def path12(x, y, phi):
+    """
+    Formula 8.11: C|C[pi/2]SC[pi/2]|C
+    """
+    rho, theta = _csc_opposite(x, y, phi)
+    valid = rho >= 4
+    u = np.sqrt(rho*rho - 4) - 4
+    A = np.arctan2(2, u + 4)
+    t = M(theta + np.pi/2 + A)
+    v = M(t - phi)
+    half_pi = np.full_like(t, np.pi/2)
+    return [t, half_pi, u, half_pi, v], valid
+
+
+PATH_FNS = [
+    path1, path2, path3, path4, path5, path6,
+    path7, path8, path9, path10, path11, path12
+]
+
+
+def change_of_basis(starts, goals):
+    """
+    Vectorized change_of_basis with angles in radians: pose of every goal
+    in the frame of its start.
+    """
+    dx = goals[:, 0] - starts[:, 0]
+    dy = goals[:, 1] - starts[:, 1]
+    cos_th = np.cos(starts[:, 2])
+    sin_th = np.sin(starts[:, 2])
+    x = dx * cos_th + dy * sin_th
+    y = -dx * sin_th + dy * cos_th
+    phi = goals[:, 2] - starts[:, 2]
+    return x, y, phi
+
+
+def word_variants(x, y, phi):
+    """
+    Yield (word, params, valid) for the 48 words, in the same order as
+    get_all_paths.
+    """
+    for k, get_path in enumerate(PATH_FNS):
+        yield 4*k, *get_path(x, y, phi)
+        yield 4*k + 1, *get_path(-x, y, -phi)
+        yield 4*k + 2, *get_path(x, -y, -phi)
+        yield 4*k + 3, *get_path(-x, -y, phi)
+
+
+def all_words(x, y, phi):
+    """
+    Evaluate the 48 words for the normalized relative poses (x, y, phi).
+    Returns the signed params, shape (N, 48, MAX_SEGMENTS), and their
+    lengths, shape (N, 48), with inf for the words that do not exist.
+    """
+    n = len(x)
+    params = np.zeros((n, 4*len(PATH_FNS), MAX_SEGMENTS))
+    valid = np.zeros((n, 4*len(PATH_FNS)), dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for word, word_params, word_valid in word_variants(x, y, phi):
+            params[:, word, :len(word_params)] = np.stack(word_params, axis=1)
+            valid[:, word] = word_valid
+    lengths = np.abs(params).sum(axis=2)
+    #Words with nan params do not exist, nor do the ones that are all zeros
+    valid &= np.isfinite(lengths) & (lengths > 0)
+    lengths[~valid] = np.inf
+    params[~valid] = 0.0
+    return params, lengths
+
+
+def word_lengths(x, y, phi):
+    """
+    Same as all_words but only the lengths, shape (N, 48), are kept.
+    """
+    lengths = np.empty((len(x), 4*len(PATH_FNS)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for word, word_params, word_valid in word_variants(x, y, phi):
+            length = sum(np.abs(param) for param in word_params)
+            valid = word_valid & np.isfinite(length) & (length > 0)
+            lengths[:, word] = np.where(valid, length, np.inf)
+    return lengths
+
+
+def get_optimal_paths_batch(starts, goals, turning_radius: float=0.1):
+    """
+    Solve N Reeds-Shepp problems at once. starts and goals are (N, 3) arrays
+    of poses (x, y, yaw) with yaw in radians.
+
+    Returns (words, params, lengths):
+        words: (N,) word id of the shortest path, -1 if there is none.
+        params: (N, MAX_SEGMENTS) signed segment params scaled by the
+            turning radius, zero padded.
+        lengths: (N,) length of the shortest path, inf if there is none.
+    Identical start and goal have no path and length 0.
+    """
+    starts = np.atleast_2d(np.asarray(starts, dtype=float))
+    goals = np.atleast_2d(np.asarray(goals, dtype=float))
+    starts, goals = np.broadcast_arrays(starts, goals)
+
+    x, y, phi = change_of_basis(starts, goals)
+    params, lengths = all_words(x/turning_radius, y/turning_radius, phi)
+
+    rows = np.arange(len(x))
+    words = np.argmin(lengths, axis=1)
+    best_lengths = lengths[rows, words]
+    best_params = params[rows, words]
+
+    words[~np.isfinite(best_lengths)] = -1
+    same = np.all(starts == goals, axis=1)
+    words[same] = -1
+    best_lengths[same] = 0.0
+    best_params[same] = 0.0
+
+    return words, turning_radius*best_params, turning_radius*best_lengths
+
+
+def optimal_path_lengths(starts, goals, turning_radius: float=0.1):
+    """
+    Batched optimal_path_length: (N,) lengths of the shortest paths between
+    the (N, 3) starts and goals, without keeping any segment params.
+    """
+    starts = np.atleast_2d(np.asarray(starts, dtype=float))
+    goals = np.atleast_2d(np.asarray(goals, dtype=float))
+    starts, goals = np.broadcast_arrays(starts, goals)
+
+    x, y, phi = change_of_basis(starts, goals)
+    lengths = word_lengths(x/turning_radius, y/turning_radius, phi).min(axis=1)
+    lengths[np.all(starts == goals, axis=1)] = 0.0
+    return turning_radius*lengths
+
+
+def path_from_word(word: int, params):
+    """
+    Build the RSPath of a word returned by get_optimal_paths_batch.
+    """
+    if word < 0:
+        return None
+    n = len(WORD_STEERING[word])
+    return RSPath(int(word), tuple(float(param) for param in params[:n]))
@@ -1,72 +1,78 @@
-import math
-
 import numpy as np
 
-from utils import *
-import reeds_shepp.reeds_shepp as rs
+
+MAX_SEGMENTS = 5
 
 
-def trace_path_points(path, pose: tuple = (0, 0, 0), turning_radius: float=0.1):
+def trace_path_points(path, pose: tuple = (0, 0, 0), turning_radius: float=0.1,
+                      resolution: float=0.01) -> np.ndarray:
     """
-    Compute the trajectory points for a given path (list of reeds_shepp.PathElements).
-    Returns a list of (x, y) points representing the trajectory.
+    Compute the trajectory points for a given path (reeds_shepp.RSPath).
+    Returns an (N, 3) array of (x, y, theta) poses starting at pose, with
+    consecutive poses at most resolution apart along the path.
     """
-    # Initialize starting state: position (0, 0) and heading 0 radians (along positive x-axis)
-    x, y, theta = pose
-    poses = [pose]  # Start with the initial point
-    
-    for e in path:
-        gear_val = 1 if e.gear == rs.Gear.FORWARD else -1  # Adjust based on actual enum access
-        
-        if e.steering == rs.Steering.STRAIGHT:  # Replace with actual enum for Steering.STRAIGHT
-            # Move straight: distance = gear * parameter
-            dist = gear_val * e.param
-            steps = int(round(e.param/0.001)) + 1
-            steps = 10
-            for delta in np.linspace(0, dist, steps):
-                x_new = x + delta * math.cos(theta)
-                y_new = y + delta * math.sin(theta)
-                poses.append((x_new, y_new, theta))
+    poses, _ = trace_paths([path], [pose], turning_radius, resolution)
+    return poses
 
-            x, y = x_new, y_new,
-            
-        else:  # Turning motion (LEFT or RIGHT)
-            # Determine radius sign: +1 for LEFT, -1 for RIGHT
-            r_val = 1.0 if e.steering == rs.Steering.LEFT else -1.0  # Replace with actual enums
 
-            # Compute circle center relative to current position and heading
-            cx = x - r_val * math.sin(theta)
-            cy = y + r_val * math.cos(theta)
-            cx = x - r_val*turning_radius * math.sin(theta)
-            cy = y + r_val*turning_radius * math.cos(theta)
-            
-            # Combined rotation angle = gear * parameter * radius_sign
-            angle_sign = gear_val * r_val
-            rot_angle = angle_sign * e.param
-            rot_angle = angle_sign * (e.param / turning_radius)
+def trace_paths(paths: list, poses, turning_radius: float=0.1,
+                resolution: float=0.01) -> tuple:
+    """
+    Trace a batch of paths at once, paths[k] starting at poses[k].
+    Returns (points, offsets): the (M, 3) array with the poses of all the
+    paths one after the other, and the (K + 1,) offsets such that path k
+    is points[offsets[k]: offsets[k + 1]].
+    """
+    n_paths = len(paths)
+    # Slot 0 is a zero length segment that only yields the start pose
+    dist = np.zeros((n_paths, MAX_SEGMENTS + 1))
+    curvature = np.zeros((n_paths, MAX_SEGMENTS + 1))
+    for k, path in enumerate(paths):
+        if path is None:
+            continue
+        for n, (param, steering, gear) in enumerate(path, start=1):
+            dist[k, n] = gear*param
+            # LEFT turns counterclockwise
+            curvature[k, n] = -steering/turning_radius
 
-            # Vector from center to current position
-            dx = x - cx
-            dy = y - cy
-            
-            # Rotate vector by rot_angle (counterclockwise)
-            arc_len = turning_radius*e.param
-            steps = int(round(arc_len/0.001)) + 1
-            steps = 10
-            angles = np.linspace(0, rot_angle, steps)
-            cos_rot = np.cos(angles)
-            sin_rot = np.sin(angles)
-            new_dx = dx * cos_rot - dy * sin_rot
-            new_dy = dx * sin_rot + dy * cos_rot
-            
-            # New position after turning
-            x_new = cx + new_dx
-            y_new = cy + new_dy
+    # Pose at the start of every segment
+    starts = np.empty((n_paths, MAX_SEGMENTS + 1, 3))
+    starts[:, 0] = np.asarray(poses, dtype=float).reshape(n_paths, 3)
+    for n in range(MAX_SEGMENTS):
+        starts[:, n + 1] = advance(starts[:, n], dist[:, n], curvature[:, n])
 
-            theta_new = theta + rot_angle  # Update heading
-            
-            for x2, y2, theta2 in zip(x_new, y_new, theta + angles):
-                poses.append((x2, y2, theta2))
-            x, y, theta = x_new[-1], y_new[-1], theta_new
-    
-    return poses
+    samples = np.ceil(np.abs(dist) / resolution).astype(int)
+    samples[:, 0] = 1
+    samples = samples.ravel()
+    total = samples.sum()
+
+    # Segment of every output pose and its arc length along that segment
+    segment = np.repeat(np.arange(samples.size), samples)
+    first = np.cumsum(samples) - samples
+    step = np.arange(total) - first[segment] + 1
+    s = dist.ravel()[segment] * step / samples[segment]
+
+    points = advance(
+        starts.reshape(-1, 3)[segment], s, curvature.ravel()[segment]
+    )
+    offsets = np.zeros(n_paths + 1, dtype=int)
+    offsets[1:] = np.cumsum(samples.reshape(n_paths, -1).sum(axis=1))
+    return points, offsets
+
+
+def advance(poses: np.ndarray, s: np.ndarray, curvature: np.ndarray) -> np.ndarray:
+    """
+    Move the (N, 3) poses a signed arc length s along arcs of the given
+    curvature (0 for straight lines).
+    """
+    x, y, theta = poses[:, 0], poses[:, 1], poses[:, 2]
+    new_theta = theta + curvature*s
+    turning = curvature != 0
+    k = np.where(turning, curvature, 1.0)
+    new_x = np.where(
+        turning, x + (np.sin(new_theta) - np.sin(theta))/k, x + s*np.cos(theta)
+    )
+    new_y = np.where(
+        turning, y - (np.cos(new_theta) - np.cos(theta))/k, y + s*np.sin(theta)
+    )
+    return np.stack([new_x, new_y, new_theta], axis=1)
@@ -0,0 +1,126 @@
+"""
+Lookup table of optimal Reeds-Shepp lengths.
+
+The length of the optimal path only depends on the pose of the goal in the
+frame of the start, normalized by the turning radius. The table samples it
+on a regular (x, y, phi) grid over [-extent, extent]^2 x [-pi, pi) and is
+stored as a .npy file (plus a small .json with its extent) so it can be
+memory-mapped instead of rebuilt.
+
+Build it once with:
+    python -m reeds_shepp.lut [--output rs_lut.npy] [--extent 6] [--size 121]
+"""
+
+import json
+from argparse import ArgumentParser
+
+import numpy as np
+
+from .batch import change_of_basis, optimal_path_lengths
+
+
+class ReedsSheppLUT:
+    def __init__(self, table: np.ndarray, extent: float, turning_radius: float=0.1) -> None:
+        self.table = table
+        self.extent = extent
+        self.turning_radius = turning_radius
+
+    @classmethod
+    def build(cls, extent: float=6.0, size: int=121, yaw_bins: int=72,
+              turning_radius: float=0.1, chunk: int=1 << 15) -> "ReedsSheppLUT":
+        xs = np.linspace(-extent, extent, size)
+        phis = -np.pi + 2*np.pi*np.arange(yaw_bins)/yaw_bins
+        grid = np.stack(
+            np.meshgrid(xs, xs, phis, indexing="ij"), axis=-1
+        ).reshape(-1, 3)
+        table = np.empty(len(grid), dtype=np.float32)
+        origin = np.zeros(3)
+        for i in range(0, len(grid), chunk):
+            table[i: i + chunk] = optimal_path_lengths(origin, grid[i: i + chunk], 1.0)
+        return cls(table.reshape(size, size, yaw_bins), extent, turning_radius)
+
+    def save(self, path: str) -> None:
+        np.save(table_path(path), self.table)
+        with open(meta_path(path), "w") as f:
+            json.dump({"extent": self.extent}, f)
+
+    @classmethod
+    def load(cls, path: str, turning_radius: float=0.1) -> "ReedsSheppLUT":
+        table = np.load(table_path(path), mmap_mode="r")
+        with open(meta_path(path)) as f:
+            meta = json.load(f)
+        return cls(table, meta["extent"], turning_radius)
+
+    def lengths(self, starts, goals) -> np.ndarray:
+        """
+        Approximate optimal_path_lengths(starts, goals, turning_radius) with
+        trilinear interpolation. Pairs outside the table are solved exactly.
+        """
+        starts = np.atleast_2d(np.asarray(starts, dtype=float))
+        goals = np.atleast_2d(np.asarray(goals, dtype=float))
+        starts, goals = np.broadcast_arrays(starts, goals)
+
+        x, y, phi = change_of_basis(starts, goals)
+        x = x / self.turning_radius
+        y = y / self.turning_radius
+
+        nx, ny, nphi = self.table.shape
+        fx = (x + self.extent) / (2*self.extent) * (nx - 1)
+        fy = (y + self.extent) / (2*self.extent) * (ny - 1)
+        fphi = (np.mod(phi + np.pi, 2*np.pi)) / (2*np.pi) * nphi
+        inside = (fx >= 0) & (fx <= nx - 1) & (fy >= 0) & (fy <= ny - 1)
+
+        i = np.clip(np.floor(fx).astype(int), 0, nx - 2)
+        j = np.clip(np.floor(fy).astype(int), 0, ny - 2)
+        k = np.floor(fphi).astype(int) % nphi
+        k1 = (k + 1) % nphi
+        tx = np.clip(fx - i, 0.0, 1.0)
+        ty = np.clip(fy - j, 0.0, 1.0)
+        tphi = fphi - np.floor(fphi)
+
+        t = self.table
+        lengths = 0.0
+        for di, wx in ((0, 1 - tx), (1, tx)):
+            for dj, wy in ((0, 1 - ty), (1, ty)):
+                lengths = lengths + wx*wy*(
+                    (1 - tphi)*t[i + di, j + dj, k] + tphi*t[i + di, j + dj, k1]
+                )
+        lengths = self.turning_radius*np.asarray(lengths, dtype=float)
+
+        if not inside.all():
+            outside = ~inside
+            lengths[outside] = optimal_path_lengths(
+                starts[outside], goals[outside], self.turning_radius
+            )
+        return lengths
+
+
+def table_path(path: str) -> str:
+    """path with the .npy suffix np.save appends when it is missing"""
+    return path if path.endswith(".npy") else f"{path}.npy"
+
+
+def meta_path(path: str) -> str:
+    return f"{table_path(path)[:-len('.npy')]}.json"
+
+
+def parse_args() -> object:
+    parser = ArgumentParser()
+    parser.add_argument("--output", default="rs_lut.npy", type=str)
+    parser.add_argument("--extent", default=6.0, type=float,
+                        help="Extent of x and y, in turning radii")
+    parser.add_argument("--size", default=121, type=int,
+                        help="Samples along x and y")
+    parser.add_argument("--yaw-bins", default=72, type=int,
+                        help="Samples along the relative yaw")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    lut = ReedsSheppLUT.build(args.extent, args.size, args.yaw_bins)
+    lut.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,9 +8,12 @@ notes: there are some typos in the formulas given in the paper;
 some formulas have been adapted (cf http://msl.cs.uiuc.edu/~lavalle/cs326a/rs.c)
 
 Each of the 12 functions (each representing 4 of the 48 possible words)
-have 3 arguments x, y and phi, the goal position and angle (in degrees) of the
+have 3 arguments x, y and phi, the goal position and angle (in radians) of the
 object given it starts at position (0, 0) and angle 0, and returns the
-corresponding path (if it exists) as a list of PathElements (or an empty list).
+parameters of the corresponding path (if it exists) as a tuple (or None).
+
+Paths are stored as RSPath objects: the id of one of the 48 words and the
+signed parameters of its segments.
 
 (actually there are less than 48 possible words but this code is not optimized)
 """
@@ -18,7 +21,6 @@ corresponding path (if it exists) as a list of PathElements (or an empty list).
 from .utils import *
 import math
 from enum import Enum
-from dataclasses import dataclass, replace
 
 
 class Steering(Enum):
@@ -32,173 +34,286 @@ class Gear(Enum):
     BACKWARD = -1
 
 
-@dataclass(eq=True)
-class PathElement:
-    param: float
-    steering: Steering
-    gear: Gear
+#(steering, gear) of the segments of each of the 12 base words
+WORDS = [
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.STRAIGHT, Gear.FORWARD),
+        (Steering.LEFT, Gear.FORWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.STRAIGHT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.FORWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+        (Steering.LEFT, Gear.FORWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.FORWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.FORWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+        (Steering.RIGHT, Gear.FORWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+        (Steering.STRAIGHT, Gear.BACKWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.STRAIGHT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.FORWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+        (Steering.STRAIGHT, Gear.BACKWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.STRAIGHT, Gear.FORWARD),
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+    ],
+    [
+        (Steering.LEFT, Gear.FORWARD),
+        (Steering.RIGHT, Gear.BACKWARD),
+        (Steering.STRAIGHT, Gear.BACKWARD),
+        (Steering.LEFT, Gear.BACKWARD),
+        (Steering.RIGHT, Gear.FORWARD),
+    ],
+]
+
+
+# Word 4*k + variant is the k-th word above (path{k+1}_params), its timeflip
+# (variant 1), its reflection (variant 2) or both (variant 3), in the same
+# order used by get_all_paths.
+WORD_STEERING = tuple(
+    tuple(flip_steering * steering.value for steering, _ in word)
+    for word in WORDS
+    for flip_steering in (1, 1, -1, -1)
+)
+WORD_GEAR = tuple(
+    tuple(flip_gear * gear.value for _, gear in word)
+    for word in WORDS
+    for flip_gear in (1, -1, 1, -1)
+)
+
+
+class RSPath:
+    """
+    Compact Reeds-Shepp path: a word id and the signed params of its
+    segments. A negative param means the segment is driven with the
+    opposite gear of the word, zero params are skipped.
+    """
+    __slots__ = ("word", "params")
+
+    def __init__(self, word: int, params: tuple) -> None:
+        self.word = word
+        self.params = params
+
+    def __iter__(self):
+        """
+        Yield (distance, steering, gear) for every segment, with steering
+        and gear as the values of Steering and Gear.
+        """
+        steerings = WORD_STEERING[self.word]
+        gears = WORD_GEAR[self.word]
+        for param, steering, gear in zip(self.params, steerings, gears):
+            if param > 0:
+                yield param, steering, gear
+            elif param < 0:
+                yield -param, steering, -gear
+
+    def __len__(self) -> int:
+        return sum(1 for param in self.params if param != 0)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RSPath):
+            return NotImplemented
+        return self.word == other.word and self.params == other.params
+
+    def __repr__(self) -> str:
+        segments = ", ".join(
+            f"{Steering(steering).name[0]}{'+' if gear > 0 else '-'}"
+            f"{round(param, 2)}"
+            for param, steering, gear in self
+        )
+        return f"RSPath({self.word}: {segments})"
+
+    @property
+    def length(self) -> float:
+        acc = 0.0
+        for param in self.params:
+            acc += abs(param)
+        return acc
+
+    def scaled(self, factor: float) -> "RSPath":
+        return RSPath(self.word, tuple(factor*param for param in self.params))
+
+    def encode(self) -> tuple:
+        """
+        Flat (word, *params) tuple, e.g. to store it in a numpy array
+        """
+        return (self.word, *self.params)
 
     @classmethod
-    def create(cls, param: float, steering: Steering, gear: Gear):
-        if param >= 0:
-            return cls(param, steering, gear)
-        else:
-            return cls(-param, steering, gear).reverse_gear()
+    def decode(cls, encoded) -> "RSPath":
+        word = int(encoded[0])
+        n = len(WORD_STEERING[word])
+        return cls(word, tuple(float(param) for param in encoded[1: n + 1]))
 
-    def __repr__(self):
-        s = "{ Steering: " + self.steering.name + "\tGear: " + self.gear.name \
-            + "\tdistance: " + str(round(self.param, 2)) + " }"
-        return s
 
-    def reverse_steering(self):
-        steering = Steering(-self.steering.value)
-        return replace(self, steering=steering)
+def relative_pose(start, end, turning_radius: float=1.0):
+    """
+    Pose of end in the frame of start, with the distances normalized by the
+    turning radius. Angles in radians.
+    """
+    theta = start[2]
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    x = (dx * math.cos(theta) + dy * math.sin(theta)) / turning_radius
+    y = (-dx * math.sin(theta) + dy * math.cos(theta)) / turning_radius
+    phi = end[2] - theta
+    return x, y, phi
 
-    def reverse_gear(self):
-        gear = Gear(-self.gear.value)
-        return replace(self, gear=gear)
 
-#Turning radius
-def path_length(path, turning_radius: float=0.1):
+def path_length(path):
     """
     this one's obvious
     """
-    acc = 0
-    for e in path:
-        if e.steering == Steering.STRAIGHT:
-            acc += e.param
-        else:
-            acc += turning_radius*e.param
-    return sum([e.param for e in path])
+    return path.length
 
 
 def get_optimal_path(start, end, turning_radius=0.1):
     """
     Return the shortest path from start to end among those that exist,
-    with a specified turning radius (default is 1.0).
+    with a specified turning radius (default is 0.1). Angles in radians.
     """
-    if start == end:
+    if tuple(start) == tuple(end):
         return None
-    
-    # Convert angles to degrees for change_of_basis
-    start_deg = (start[0], start[1], rad2deg(start[2]))
-    end_deg = (end[0], end[1], rad2deg(end[2]))
-    
-    # Compute relative pose in start's frame
-    x_rel, y_rel, theta_rel = change_of_basis(start_deg, end_deg)
-    
-    # Normalize by turning radius
-    x_rel_norm = x_rel / turning_radius
-    y_rel_norm = y_rel / turning_radius
-    
+
     # Get all paths in normalized space (turning radius = 1)
-    paths = get_all_paths((0, 0, 0), (x_rel_norm, y_rel_norm, theta_rel))
-    
+    paths = all_paths(*relative_pose(start, end, turning_radius))
+
     if not paths:
         return None
-    
-    # Find shortest path in normalized space
+
+    # Find shortest path in normalized space, then scale it back
     best_normalized_path = min(paths, key=path_length)
-    
-    # Scale parameters by turning radius
-    scaled_path = []
-    for elem in best_normalized_path:
-        scaled_param = elem.param * turning_radius
-        scaled_path.append(PathElement(scaled_param, elem.steering, elem.gear))
-    
-    return scaled_path
+    return best_normalized_path.scaled(turning_radius)
 
 
-def get_all_paths(start, end):
+def optimal_path_length(start, end, turning_radius=0.1):
     """
-    Return a list of all the paths from start to end generated by the
-    12 functions and their variants
+    Return the length of the shortest path from start to end without
+    building any path, angles in radians.
     """
-    path_fns = [path1, path2, path3, path4, path5, path6, \
-                path7, path8, path9, path10, path11, path12]
-    paths = []
-
-    # get coordinates of end in the set of axis where start is (0,0,0)
-    x, y, theta = change_of_basis(start, end)
-
-    for get_path in path_fns:
-        # get the four variants for each path type, cf article
-        paths.append(get_path(x, y, theta))
-        paths.append(timeflip(get_path(-x, y, -theta)))
-        paths.append(reflect(get_path(x, -y, -theta)))
-        paths.append(reflect(timeflip(get_path(-x, -y, theta))))
-
-    # remove path elements that have parameter 0
-    for i in range(len(paths)):
-        paths[i] = list(filter(lambda e: e.param != 0, paths[i]))
+    if tuple(start) == tuple(end):
+        return 0.0
 
-    # remove empty paths
-    paths = list(filter(None, paths))
+    x, y, phi = relative_pose(start, end, turning_radius)
 
-    return paths
+    best = math.inf
+    for get_params in PARAM_FNS:
+        # same four variants as all_paths, their lengths do not change
+        for params in (
+            get_params(x, y, phi),
+            get_params(-x, y, -phi),
+            get_params(x, -y, -phi),
+            get_params(-x, -y, phi),
+        ):
+            if params is None:
+                continue
+            length = 0.0
+            for param in params:
+                length += abs(param)
+            if 0 < length < best:
+                best = length
+    return turning_radius * best
 
 
-def timeflip(path):
+def get_all_paths(start, end):
     """
-    timeflip transform described around the end of the article
+    Return a list of all the paths from start to end generated by the
+    12 functions and their variants. Angles in degrees.
     """
-    new_path = [e.reverse_gear() for e in path]
-    return new_path
+    # get coordinates of end in the set of axis where start is (0,0,0)
+    x, y, theta = change_of_basis(start, end)
+    return all_paths(x, y, deg2rad(theta))
 
 
-def reflect(path):
+def all_paths(x, y, phi):
     """
-    reflect transform described around the end of the article
+    All the paths from the origin to (x, y, phi), phi in radians
     """
-    new_path = [e.reverse_steering() for e in path]
-    return new_path
+    paths = []
+    for k, get_params in enumerate(PARAM_FNS):
+        # get the four variants for each path type, cf article
+        variants = (
+            get_params(x, y, phi),
+            get_params(-x, y, -phi),
+            get_params(x, -y, -phi),
+            get_params(-x, -y, phi),
+        )
+        for variant, params in enumerate(variants):
+            # remove paths that do not exist or are empty
+            if params is None or not any(params):
+                continue
+            paths.append(RSPath(4*k + variant, params))
+
+    return paths
 
 
-def path1(x, y, phi):
+def path1_params(x, y, phi):
     """
     Formula 8.1: CSC (same turns)
     """
-    phi = deg2rad(phi)
-    path = []
-
     u, t = R(x - math.sin(phi), y - 1 + math.cos(phi))
     v = M(phi - t)
+    return t, u, v
 
-    path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-    path.append(PathElement.create(u, Steering.STRAIGHT, Gear.FORWARD))
-    path.append(PathElement.create(v, Steering.LEFT, Gear.FORWARD))
 
-    return path
-
-
-def path2(x, y, phi):
+def path2_params(x, y, phi):
     """
     Formula 8.2: CSC (opposite turns)
     """
-    phi = M(deg2rad(phi))
-    path = []
-
     rho, t1 = R(x + math.sin(phi), y - 1 - math.cos(phi))
 
     if rho * rho >= 4:
         u = math.sqrt(rho * rho - 4)
         t = M(t1 + math.atan2(2, u))
         v = M(t - phi)
+        return t, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.STRAIGHT, Gear.FORWARD))
-        path.append(PathElement.create(v, Steering.RIGHT, Gear.FORWARD))
 
-    return path
-
-
-def path3(x, y, phi):
+def path3_params(x, y, phi):
     """
     Formula 8.3: C|C|C
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x - math.sin(phi)
     eta = y - 1 + math.cos(phi)
     rho, theta = R(xi, eta)
@@ -208,21 +323,14 @@ def path3(x, y, phi):
         t = M(theta + math.pi/2 + A)
         u = M(math.pi - 2*A)
         v = M(phi - t - u)
+        return t, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.LEFT, Gear.FORWARD))
-
-    return path
 
-
-def path4(x, y, phi):
+def path4_params(x, y, phi):
     """
     Formula 8.4 (1): C|CC
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x - math.sin(phi)
     eta = y - 1 + math.cos(phi)
     rho, theta = R(xi, eta)
@@ -232,21 +340,14 @@ def path4(x, y, phi):
         t = M(theta + math.pi/2 + A)
         u = M(math.pi - 2*A)
         v = M(t + u - phi)
-
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.LEFT, Gear.BACKWARD))
-
-    return path
+        return t, u, v
+    return None
 
 
-def path5(x, y, phi):
+def path5_params(x, y, phi):
     """
     Formula 8.4 (2): CC|C
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x - math.sin(phi)
     eta = y - 1 + math.cos(phi)
     rho, theta = R(xi, eta)
@@ -256,21 +357,14 @@ def path5(x, y, phi):
         A = math.asin(2 * math.sin(u) / rho)
         t = M(theta + math.pi/2 - A)
         v = M(t - u - phi)
+        return t, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.RIGHT, Gear.FORWARD))
-        path.append(PathElement.create(v, Steering.LEFT, Gear.BACKWARD))
-
-    return path
 
-
-def path6(x, y, phi):
+def path6_params(x, y, phi):
     """
     Formula 8.7: CCu|CuC
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x + math.sin(phi)
     eta = y - 1 - math.cos(phi)
     rho, theta = R(xi, eta)
@@ -286,22 +380,14 @@ def path6(x, y, phi):
             t = M(theta + math.pi/2 - A)
             u = M(math.pi - A)
             v = M(phi - t + 2*u)
+        return t, u, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.RIGHT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.LEFT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.RIGHT, Gear.BACKWARD))
 
-    return path
-
-
-def path7(x, y, phi):
+def path7_params(x, y, phi):
     """
     Formula 8.8: C|CuCu|C
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x + math.sin(phi)
     eta = y - 1 - math.cos(phi)
     rho, theta = R(xi, eta)
@@ -312,22 +398,14 @@ def path7(x, y, phi):
         A = math.asin(2 * math.sin(u) / rho)
         t = M(theta + math.pi/2 + A)
         v = M(t - phi)
+        return t, u, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(u, Steering.LEFT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.RIGHT, Gear.FORWARD))
 
-    return path
-
-
-def path8(x, y, phi):
+def path8_params(x, y, phi):
     """
     Formula 8.9 (1): C|C[pi/2]SC
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x - math.sin(phi)
     eta = y - 1 + math.cos(phi)
     rho, theta = R(xi, eta)
@@ -337,22 +415,14 @@ def path8(x, y, phi):
         A = math.atan2(2, u+2)
         t = M(theta + math.pi/2 + A)
         v = M(t - phi + math.pi/2)
+        return t, math.pi/2, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(u, Steering.STRAIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.LEFT, Gear.BACKWARD))
-
-    return path
 
-
-def path9(x, y, phi):
+def path9_params(x, y, phi):
     """
     Formula 8.9 (2): CSC[pi/2]|C
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x - math.sin(phi)
     eta = y - 1 + math.cos(phi)
     rho, theta = R(xi, eta)
@@ -362,22 +432,14 @@ def path9(x, y, phi):
         A = math.atan2(u+2, 2)
         t = M(theta + math.pi/2 - A)
         v = M(t - phi - math.pi/2)
-
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.STRAIGHT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2, Steering.RIGHT, Gear.FORWARD))
-        path.append(PathElement.create(v, Steering.LEFT, Gear.BACKWARD))
-
-    return path
+        return t, u, math.pi/2, v
+    return None
 
 
-def path10(x, y, phi):
+def path10_params(x, y, phi):
     """
     Formula 8.10 (1): C|C[pi/2]SC
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x + math.sin(phi)
     eta = y - 1 - math.cos(phi)
     rho, theta = R(xi, eta)
@@ -386,22 +448,14 @@ def path10(x, y, phi):
         t = M(theta + math.pi/2)
         u = rho - 2
         v = M(phi - t - math.pi/2)
+        return t, math.pi/2, u, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(u, Steering.STRAIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.RIGHT, Gear.BACKWARD))
-
-    return path
 
-
-def path11(x, y, phi):
+def path11_params(x, y, phi):
     """
     Formula 8.10 (2): CSC[pi/2]|C
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x + math.sin(phi)
     eta = y - 1 - math.cos(phi)
     rho, theta = R(xi, eta)
@@ -410,22 +464,14 @@ def path11(x, y, phi):
         t = M(theta)
         u = rho - 2
         v = M(phi - t - math.pi/2)
+        return t, u, math.pi/2, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(u, Steering.STRAIGHT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(v, Steering.RIGHT, Gear.BACKWARD))
 
-    return path
-
-
-def path12(x, y, phi):
+def path12_params(x, y, phi):
     """
     Formula 8.11: C|C[pi/2]SC[pi/2]|C
     """
-    phi = deg2rad(phi)
-    path = []
-
     xi = x + math.sin(phi)
     eta = y - 1 - math.cos(phi)
     rho, theta = R(xi, eta)
@@ -435,11 +481,12 @@ def path12(x, y, phi):
         A = math.atan2(2, u+4)
         t = M(theta + math.pi/2 + A)
         v = M(t - phi)
+        return t, math.pi/2, u, math.pi/2, v
+    return None
 
-        path.append(PathElement.create(t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(u, Steering.STRAIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(math.pi/2, Steering.LEFT, Gear.BACKWARD))
-        path.append(PathElement.create(v, Steering.RIGHT, Gear.FORWARD))
 
-    return path
\ No newline at end of file
+PARAM_FNS = [
+    path1_params, path2_params, path3_params, path4_params,
+    path5_params, path6_params, path7_params, path8_params,
+    path9_params, path10_params, path11_params, path12_params
+]
@@ -0,0 +1,34 @@
+import numpy as np
+
+from reeds_shepp.batch import get_optimal_paths_batch, optimal_path_lengths, path_from_word
+from reeds_shepp.reeds_shepp import get_optimal_path, optimal_path_length, path_length
+
+
+def random_poses(rng: np.random.Generator, n: int) -> np.ndarray:
+    return np.column_stack([
+        rng.uniform(-1, 1, (n, 2)), rng.uniform(-np.pi, np.pi, n)
+    ])
+
+
+def test_paths_batch_matches_scalar():
+    rng = np.random.default_rng(0)
+    starts = random_poses(rng, 200)
+    goals = random_poses(rng, 200)
+    words, params, lengths = get_optimal_paths_batch(starts, goals, 0.1)
+    for start, goal, word, param, length in zip(starts, goals, words, params, lengths):
+        expected = path_length(get_optimal_path(start, goal, 0.1))
+        assert np.isclose(length, expected)
+        #The path rebuilt from the word is the one measured
+        assert np.isclose(path_length(path_from_word(word, param)), expected)
+
+
+def test_lengths_batch_matches_scalar():
+    rng = np.random.default_rng(1)
+    starts = random_poses(rng, 500)
+    goals = random_poses(rng, 500)
+    #Identical poses have no path, their length is 0
+    goals[:5] = starts[:5]
+    lengths = optimal_path_lengths(starts, goals, 0.1)
+    expected = [optimal_path_length(start, goal, 0.1) for start, goal in zip(starts, goals)]
+    assert np.allclose(lengths, expected)
+    assert np.all(lengths[:5] == 0.0)
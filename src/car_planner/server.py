@@ -0,0 +1,183 @@
+"""
+Planning server: loads the grid and its collision caches once and answers
+JSON-lines queries, one per line, over stdin/stdout or a Unix socket.
+
+Query:    {"id": 1, "start": [0, 0, 0], "goal": [0.2, 0.2, 0], "planner": "rrt",
+           "iterations": 10000, "refine": 0, "seed": 0}
+Response: {"id": 1, "route": [[x, y, yaw], ...], "length": ..., "nodes": ...,
+           "iterations": ..., "reused": true, "latency_ms": ...,
+           "cache": {"path_hits": ..., "verdict_hits": ..., ...}}
+
+Planners are kept per (planner, start), queries from a start already seen
+grow the same tree (and reuse its cached edges) towards the new goal. A
+kept tree that already reaches the goal answers at once, without planning;
+refine is the number of iterations spent improving its route (RRT*) then.
+Optimal paths and edge verdicts are memoized across all the queries,
+cache reports the hits and misses so far.
+
+python -m car_planner.server [--grid grid.npy] [--socket /tmp/planner.sock]
+"""
+
+import json
+import os
+import random
+import socketserver
+import sys
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict
+
+import numpy as np
+
+from car.car import Car
+from collisions.grid import Grid
+from collisions.cspace import CSpace
+from plan import PLANNERS
+from planning.cache import EdgeCache
+from utils.utils import git_root
+
+
+class PlanningServer:
+    def __init__(self, grid: Grid, cspace: CSpace, lut: object=None,
+                 max_planners: int=16) -> None:
+        self.grid = grid
+        self.cspace = cspace
+        self.lut = lut
+        self.max_planners = max_planners
+        #Optimal paths and edge verdicts, shared by all the planners
+        self.cache = EdgeCache()
+        #(planner, start) -> planner, least recently used first
+        self.planners = OrderedDict()
+
+    def planner(self, kind: str, start: list, goal: list) -> tuple:
+        """Planner rooted at start, and whether it was already there"""
+        key = (kind, *np.round(start, 6))
+        planner = self.planners.get(key)
+        if planner is not None:
+            self.planners.move_to_end(key)
+            return planner, True
+        planner = PLANNERS[kind](
+            self.grid, tuple(start), goal, self.lut, self.cspace, self.cache
+        )
+        self.planners[key] = planner
+        if len(self.planners) > self.max_planners:
+            self.planners.popitem(last=False)
+        return planner, False
+
+    def query(self, request: dict) -> dict:
+        t0 = time.perf_counter()
+        start = [float(v) for v in request["start"]]
+        goal = tuple(float(v) for v in request["goal"])
+        kind = request.get("planner", "rrt")
+        if kind not in PLANNERS:
+            raise ValueError(f"unknown planner {kind!r}")
+        if "seed" in request:
+            random.seed(request["seed"])
+            np.random.seed(request["seed"])
+
+        planner, reused = self.planner(kind, start, goal)
+        planner.retarget(goal)
+        iterations = 0
+        if reused and planner.goal_id is not None:
+            budget = request.get("refine", 0)
+        else:
+            budget = request.get("iterations", 10000)
+        finished = False
+        while not finished and iterations < budget:
+            finished = planner.update()
+            iterations += 1
+        #RRT* only finishes after max_iterations, but has a route long before
+        route = planner.get_route() if planner.goal_id is not None else np.empty((0, 3))
+        length = np.linalg.norm(np.diff(route[:, :2], axis=0), axis=1).sum()
+        return {
+            "id": request.get("id"),
+            "route": route.tolist(),
+            "length": float(length),
+            "nodes": len(planner.tree),
+            "iterations": iterations,
+            "reused": reused,
+            "latency_ms": 1000*(time.perf_counter() - t0),
+            "cache": self.cache.stats(),
+        }
+
+    def handle(self, line: str) -> str:
+        """Response line to a query line"""
+        request = {}
+        try:
+            request = json.loads(line)
+            response = self.query(request)
+        except Exception as e:
+            request_id = request.get("id") if isinstance(request, dict) else None
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        return json.dumps(response)
+
+    def serve_stdio(self) -> None:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            sys.stdout.write(self.handle(line) + "\n")
+            sys.stdout.flush()
+
+    def serve_socket(self, path: str) -> None:
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    response = server.handle(line.decode())
+                    self.wfile.write(response.encode() + b"\n")
+
+        #Binding fails if the path is taken, e.g. by a running server, whose
+        #socket must be left alone: it is only removed once bound here
+        with socketserver.UnixStreamServer(path, Handler) as unix_server:
+            try:
+                unix_server.serve_forever()
+            finally:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+
+def parse_args() -> object:
+    parser = ArgumentParser(description="JSON-lines planning server")
+    parser.add_argument("--grid", type=str, default=None, help="Occupancy grid (.npy)")
+    parser.add_argument("--cspace", type=str, default=None, help="C-space cache (.npz)")
+    parser.add_argument("--lut", type=str, default=None, help="Reeds-Shepp length table")
+    parser.add_argument("--socket", type=str, default=None, help="Unix socket, stdin/stdout if not set")
+    parser.add_argument("--max-planners", type=int, default=16)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    t0 = time.perf_counter()
+    if args.grid is None:
+        grid = Grid()
+        cspace_path = args.cspace or f"{git_root()}/cspace.npz"
+    else:
+        occupancy = np.load(args.grid)
+        grid = Grid(len(occupancy), occupancy)
+        cspace_path = args.cspace
+    if cspace_path is None:
+        cspace = CSpace(grid, Car.width, Car.height, Car.n_disks)
+    else:
+        cspace = CSpace.cached(grid, cspace_path, Car.width, Car.height, Car.n_disks)
+    lut = None
+    if args.lut is not None:
+        from reeds_shepp.lut import ReedsSheppLUT
+
+        lut = ReedsSheppLUT.load(args.lut)
+    server = PlanningServer(grid, cspace, lut, args.max_planners)
+    print(json.dumps({"ready": True, "load_ms": 1000*(time.perf_counter() - t0)}), file=sys.stderr)
+
+    if args.socket is None:
+        server.serve_stdio()
+    else:
+        server.serve_socket(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,16 @@
-import git
+from functools import lru_cache
 
-__git_repo = git.Repo(".", search_parent_directories=True)
-GIT_ROOT = __git_repo.git.rev_parse("--show-toplevel")
+
+@lru_cache(maxsize=None)
+def git_root() -> str:
+    import git
+
+    repo = git.Repo(".", search_parent_directories=True)
+    return repo.git.rev_parse("--show-toplevel")
+
+
+def __getattr__(name: str) -> str:
+    #Resolved on first use, so importing this module does not start git
+    if name == "GIT_ROOT":
+        return git_root()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")